@@ -0,0 +1,8 @@
+import time
+
+# Отсчет времени запуска: пакет app импортируется раньше любого его модуля
+STARTED_AT = time.perf_counter()
+
+from app.config import load_environment  # noqa: E402
+
+load_environment()
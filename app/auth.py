@@ -1,14 +1,18 @@
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
-from dotenv import load_dotenv
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-# Загружаем переменные окружения
-
-load_dotenv()
+from app.cache import InProcessCache
 
 # SEC-NFR-002: Используем Argon2 для хэширования паролей
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
@@ -19,6 +23,21 @@ SECRET_KEY = "your-super-secret-key-here-minimum-32-chars"
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Argon2 считается в отдельном пуле процессов, чтобы не держать GIL воркера.
+# HASH_POOL_SIZE=0 отключает пул: хэширование идет в threadpool event loop
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(min(2, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+HASH_RETRY_AFTER_SECONDS = int(os.getenv("HASH_RETRY_AFTER_SECONDS", "1"))
+
+# Кэш успешно проверенных JWT: повторный запрос с тем же токеном
+# не пересчитывает HMAC и не разбирает JSON до истечения exp. Кэш всегда
+# локальный: токен неизменяем и инвалидировать нечего, а поход в общий кэш
+# дороже самой проверки подписи
+JWT_CACHE_ENABLED = os.getenv("JWT_CACHE_ENABLED", "true").lower() == "true"
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+token_cache = InProcessCache(JWT_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 # Проверяем что SECRET_KEY установлен
 if not SECRET_KEY:
     raise ValueError(
@@ -26,24 +45,153 @@ if not SECRET_KEY:
     )
 
 
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pending = 0
+
+hash_metrics = {
+    "calls": 0,
+    "rejected": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+    "hash_seconds_total": 0.0,
+    "hash_seconds_max": 0.0,
+}
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяет пароль против хэша"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    """Создает хэш пароля"""
+def _validate_password(password: str):
     if len(password) < 8:
-        from fastapi import HTTPException, status
-
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Password must be at least 8 characters long",
         )
 
+
+def _hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def get_password_hash(password: str) -> str:
+    """Создает хэш пароля"""
+    _validate_password(password)
+    return _hash_password(password)
+
+
+def _timed_call(func, *args):
+    """Выполняется в процессе пула: возвращает результат и время начала/конца"""
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+def _get_hash_pool() -> Optional[ProcessPoolExecutor]:
+    global _hash_pool
+    if _hash_pool is None and HASH_POOL_SIZE > 0:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=HASH_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """Останавливает пул хэширования (вызывается при остановке приложения)"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
+
+
+async def _run_in_hash_pool(func, *args):
+    """Ставит Argon2 в очередь пула; при переполнении очереди отвечает 503"""
+    global _hash_pending
+    if _hash_pending >= HASH_QUEUE_LIMIT:
+        hash_metrics["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, try again later",
+            headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+        )
+
+    _hash_pending += 1
+    submitted = time.monotonic()
+    try:
+        loop = asyncio.get_running_loop()
+        result, started, finished = await loop.run_in_executor(
+            _get_hash_pool(), _timed_call, func, *args
+        )
+    finally:
+        _hash_pending -= 1
+
+    queue_wait = max(started - submitted, 0.0)
+    hash_time = finished - started
+    hash_metrics["calls"] += 1
+    hash_metrics["queue_wait_seconds_total"] += queue_wait
+    hash_metrics["queue_wait_seconds_max"] = max(
+        hash_metrics["queue_wait_seconds_max"], queue_wait
+    )
+    hash_metrics["hash_seconds_total"] += hash_time
+    hash_metrics["hash_seconds_max"] = max(hash_metrics["hash_seconds_max"], hash_time)
+    return result
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверяет пароль в пуле хэширования"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Создает хэш пароля в пуле хэширования"""
+    _validate_password(password)
+    return await _run_in_hash_pool(_hash_password, password)
+
+
+_dummy_hash: Optional[str] = None
+
+
+async def warm_up_hashing():
+    """Запускает процессы пула и готовит фиктивный хэш для verify_login_password"""
+    global _dummy_hash
+    hashes = await asyncio.gather(
+        *(
+            _run_in_hash_pool(_hash_password, secrets.token_urlsafe(16))
+            for _ in range(max(1, HASH_POOL_SIZE))
+        )
+    )
+    _dummy_hash = hashes[0]
+
+
+async def verify_login_password(
+    plain_password: str, hashed_password: Optional[str]
+) -> bool:
+    """Проверка пароля при входе
+
+    Для несуществующего пользователя (hashed_password=None) пароль все равно
+    проверяется - против фиктивного хэша, чтобы по времени ответа нельзя было
+    узнать, зарегистрирован ли email.
+    """
+    if hashed_password is None:
+        if _dummy_hash is None:
+            await warm_up_hashing()
+        await verify_password_async(plain_password, _dummy_hash)
+        return False
+    return await verify_password_async(plain_password, hashed_password)
+
+
+def get_hash_metrics() -> dict:
+    """Снимок метрик пула хэширования"""
+    return {
+        **hash_metrics,
+        "pool_size": HASH_POOL_SIZE,
+        "queue_depth": _hash_pending,
+        "queue_limit": HASH_QUEUE_LIMIT,
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создает JWT токен"""
     to_encode = data.copy()
@@ -59,8 +207,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str) -> Optional[dict]:
     """Проверяет JWT токен"""
+    if JWT_CACHE_ENABLED:
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        cached = token_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+
+    # Запись живет ровно до exp токена, токены без exp не кэшируются
+    expires_in = payload.get("exp", 0) - time.time()
+    if JWT_CACHE_ENABLED and expires_in > 0:
+        token_cache.set(cache_key, dict(payload), ttl=expires_in)
+    return payload
@@ -0,0 +1,200 @@
+import csv
+import io
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.models import Suggestion
+from app.schemas import SuggestionCreate
+from app.stats import add_status_counts
+
+# Импорт: строки вставляются пачками по BULK_BATCH_SIZE, одна транзакция на
+# пачку. Экспорт читает БД серверным курсором по EXPORT_BATCH_SIZE строк и
+# отдает каждую пачку одним куском тела ответа
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(64 * 1024)))
+BULK_MAX_REPORTED_ERRORS = int(os.getenv("BULK_MAX_REPORTED_ERRORS", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "title",
+    "text",
+    "status",
+    "created_at",
+    "updated_at",
+)
+
+
+class BulkImportResult:
+    """Итог импорта: сколько вставлено и какие строки отклонены"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Строки NDJSON с номерами; тело не собирается в памяти целиком
+
+    Строка длиннее BULK_MAX_LINE_BYTES не накапливается: вместо нее
+    отдается None, остаток до перевода строки пропускается.
+    """
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        if skipping:
+            end = chunk.find(b"\n")
+            if end < 0:
+                continue
+            chunk = chunk[end + 1 :]
+            skipping = False
+            line_no += 1
+            yield line_no, None
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line if len(line) <= BULK_MAX_LINE_BYTES else None
+        if len(buffer) > BULK_MAX_LINE_BYTES:
+            buffer = b""
+            skipping = True
+    if skipping:
+        yield line_no + 1, None
+    elif buffer:
+        yield line_no + 1, buffer if len(buffer) <= BULK_MAX_LINE_BYTES else None
+
+
+def _describe_error(exc: ValueError) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}"
+            for error in exc.errors()
+        )
+    return f"invalid JSON: {exc}"
+
+
+def _parse_row(line: bytes, user_id: int) -> dict:
+    suggestion = SuggestionCreate.model_validate(orjson.loads(line))
+    return {**suggestion.model_dump(), "user_id": user_id, "status": "pending"}
+
+
+async def _insert_batch(
+    db: AsyncSession, batch: List[Tuple[int, dict]], result: BulkImportResult
+):
+    # Массовый INSERT не вызывает события ORM, счетчик статуса - вручную
+    try:
+        await db.execute(insert(Suggestion), [row for _, row in batch])
+        await add_status_counts(db, {"pending": len(batch)})
+        await db.commit()
+        result.inserted += len(batch)
+        return
+    except SQLAlchemyError:
+        await db.rollback()
+
+    # Пачка не прошла целиком: вставляем по одной, чтобы найти плохие строки
+    for line_no, row in batch:
+        try:
+            await db.execute(insert(Suggestion), [row])
+            await add_status_counts(db, {"pending": 1})
+            await db.commit()
+            result.inserted += 1
+        except SQLAlchemyError as e:
+            await db.rollback()
+            result.add_error(line_no, f"database error: {e.__class__.__name__}")
+
+
+async def import_ndjson(
+    db: AsyncSession, chunks: AsyncIterator[bytes], user_id: int
+) -> BulkImportResult:
+    """Вставляет предложения из NDJSON-потока от имени user_id"""
+    result = BulkImportResult()
+    batch: List[Tuple[int, dict]] = []
+    rows = 0
+    async for line_no, line in iter_ndjson_lines(chunks):
+        if line is not None and not line.strip():
+            continue
+        rows += 1
+        if rows > BULK_MAX_ROWS:
+            result.add_error(line_no, f"row limit {BULK_MAX_ROWS} exceeded")
+            break
+        if line is None:
+            result.add_error(line_no, f"line exceeds {BULK_MAX_LINE_BYTES} bytes")
+            continue
+        try:
+            batch.append((line_no, _parse_row(line, user_id)))
+        except ValueError as e:
+            result.add_error(line_no, _describe_error(e))
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            await _insert_batch(db, batch, result)
+            batch = []
+    if batch:
+        await _insert_batch(db, batch, result)
+    return result
+
+
+def _csv_cell(value) -> str:
+    if value is None:
+        return ""
+    value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    # Защита от CSV-инъекции: ячейка не должна начинаться как формула
+    if value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+
+def _to_csv(rows, header: bool = False) -> bytes:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_csv_cell(value) for value in row] for row in rows)
+    return output.getvalue().encode()
+
+
+def _to_ndjson(rows) -> bytes:
+    return b"".join(
+        orjson.dumps(dict(zip(EXPORT_COLUMNS, row)), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+async def export_suggestions(
+    bind: AsyncEngine, fmt: str, suggestion_status: str = None
+) -> AsyncIterator[bytes]:
+    """Тело экспорта по кускам
+
+    Сессия открывается здесь, а не берется из зависимости: FastAPI закрывает
+    сессии зависимостей до того, как начнет отправлять потоковый ответ.
+    """
+    query = select(*(getattr(Suggestion, column) for column in EXPORT_COLUMNS))
+    if suggestion_status:
+        query = query.where(Suggestion.status == suggestion_status)
+    query = query.order_by(Suggestion.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    if fmt == "csv":
+        yield _to_csv([], header=True)
+    async with AsyncSession(bind) as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield _to_csv(rows) if fmt == "csv" else _to_ndjson(rows)
@@ -0,0 +1,587 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import orjson
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import RedisError
+
+# CACHE_BACKEND=memory - кэш в памяти воркера; redis - общий кэш для всех
+# воркеров по CACHE_URL (Redis или совместимые: Valkey, KeyDB, Dragonfly).
+# CACHE_NEAR_SIZE > 0 включает локальную копию горячих ключей перед Redis,
+# устаревшие копии сбрасываются сообщениями pub/sub от других воркеров
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "suggestion_box")
+CACHE_NEAR_SIZE = int(os.getenv("CACHE_NEAR_SIZE", "1024"))
+CACHE_NEAR_TTL_SECONDS = float(os.getenv("CACHE_NEAR_TTL_SECONDS", "5"))
+CACHE_TIMEOUT_SECONDS = float(os.getenv("CACHE_TIMEOUT_SECONDS", "0.5"))
+CACHE_RETRY_SECONDS = float(os.getenv("CACHE_RETRY_SECONDS", "1"))
+
+
+class CacheBackend(ABC):
+    """Общий интерфейс кэшей
+
+    Ключи - строки. Значения - bytes или JSON-совместимые объекты:
+    общий кэш хранит их сериализованными, локальный - как есть. Методы
+    асинхронные: общий кэш ходит в сеть и не должен держать event loop.
+    """
+
+    hits = 0
+    misses = 0
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        found = await self.get_many([key])
+        return found.get(key, default)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Кладет значение; ttl переопределяет время жизни по умолчанию"""
+        await self.set_many({key: value}, ttl)
+
+    async def delete(self, key: str):
+        await self.delete_many([key])
+
+    @abstractmethod
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Найденные значения одним обращением (отсутствующих ключей нет)"""
+
+    @abstractmethod
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None): ...
+
+    @abstractmethod
+    async def delete_many(self, keys: Iterable[str]): ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Атомарно увеличивает счетчик; счетчики не вытесняются и не истекают"""
+
+    @abstractmethod
+    async def get_counter(self, key: str) -> int: ...
+
+    @abstractmethod
+    async def clear(self): ...
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+    @abstractmethod
+    def invalidate_sync(self, keys: Optional[Iterable[str]] = None):
+        """Удаляет ключи (None - все) из синхронного кода, без event loop"""
+
+    def start(self):
+        """Фоновая работа кэша; вызывается из lifespan воркера"""
+
+    async def close(self):
+        """Останавливает фоновую работу и закрывает соединения"""
+
+
+class InProcessCache:
+    """Потокобезопасный LRU-кэш с ограничением по размеру и времени жизни
+
+    Синхронный: используется напрямую там, где нет ввода-вывода (кэш
+    токенов, локальная копия перед Redis), и внутри MemoryCache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str, now: float):
+        # Вызывается под блокировкой
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return entry
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._lookup(key, time.monotonic())
+        return default if entry is None else entry[1]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._lookup(key, now)
+                if entry is not None:
+                    found[key] = entry[1]
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+        return value
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class MemoryCache(CacheBackend):
+    """Кэш в памяти воркера (CACHE_BACKEND=memory)"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.local = InProcessCache(maxsize, ttl)
+
+    @property
+    def hits(self) -> int:
+        return self.local.hits
+
+    @property
+    def misses(self) -> int:
+        return self.local.misses
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return self.local.get(key, default)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return self.local.get_many(keys)
+
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None):
+        self.local.set_many(mapping, ttl)
+
+    async def delete_many(self, keys: Iterable[str]):
+        for key in keys:
+            self.local.delete(key)
+
+    async def incr(self, key: str) -> int:
+        return self.local.incr(key)
+
+    async def get_counter(self, key: str) -> int:
+        return self.local.get_counter(key)
+
+    async def clear(self):
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return self.local.stats()
+
+    def invalidate_sync(self, keys: Optional[Iterable[str]] = None):
+        if keys is None:
+            self.local.clear()
+            return
+        for key in keys:
+            self.local.delete(key)
+
+
+# Метка типа в первом байте: bytes хранятся как есть, остальное - JSON
+def _dumps(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return b"b" + value
+    return b"j" + orjson.dumps(value)
+
+
+def _loads(data: bytes) -> Any:
+    if data[:1] == b"b":
+        return data[1:]
+    return orjson.loads(data[1:])
+
+
+# Все общие кэши процесса: lifespan запускает и останавливает их потоки
+# подписки, а после fork (gunicorn preload_app) они заводят свои соединения
+_redis_caches: "weakref.WeakSet[RedisCache]" = weakref.WeakSet()
+
+
+def _reinit_caches_after_fork():
+    for cache in list(_redis_caches):
+        cache._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_caches_after_fork)
+
+
+# Ошибки сети и сервера: кэш их не пробрасывает
+CACHE_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+
+class RedisCache(CacheBackend):
+    """Кэш в Redis, общий для всех воркеров (клиент redis.asyncio)
+
+    Недоступный сервер не ломает запросы: чтение считается промахом, запись
+    пропускается, а повторное подключение пробуется не чаще раза в
+    CACHE_RETRY_SECONDS.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str,
+        ttl: float,
+        near_cache_size: int = 0,
+        near_cache_ttl: float = CACHE_NEAR_TTL_SECONDS,
+    ):
+        self.url = url
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._prefix = f"{CACHE_KEY_PREFIX}:{namespace}:"
+        self._channel = f"{CACHE_KEY_PREFIX}:invalidate:{namespace}"
+        self._redis: Optional[AsyncRedis] = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retry_at = 0.0
+        self._near_size = near_cache_size
+        self._near_ttl = min(near_cache_ttl, ttl)
+        self._subscriber: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Локальная копия есть только пока идет подписка (start - close):
+        # без нее копия не узнала бы об изменениях в других воркерах
+        self.near: Optional[InProcessCache] = None
+        _redis_caches.add(self)
+
+    def _client(self) -> AsyncRedis:
+        """Клиент для текущего event loop
+
+        Соединения redis.asyncio привязаны к loop, в котором открыты. У
+        воркера он один; скрипты и тестовый клиент заводят новый на каждый
+        запуск, и тогда создается новый клиент.
+        """
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = AsyncRedis.from_url(
+                self.url,
+                socket_timeout=CACHE_TIMEOUT_SECONDS,
+                socket_connect_timeout=CACHE_TIMEOUT_SECONDS,
+                # Повторы сделали бы ожидание недоступного сервера кратным
+                retry=Retry(NoBackoff(), 0),
+            )
+            self._redis_loop = loop
+        return self._redis
+
+    def start(self):
+        """Включает локальную копию и поток подписки на сброс ключей"""
+        if self._near_size <= 0 or self.near is not None:
+            return
+        self.near = InProcessCache(self._near_size, self._near_ttl)
+        self._stop = threading.Event()
+        self._subscriber = threading.Thread(
+            target=self._listen_invalidations,
+            args=(self.near, self._stop),
+            name=f"cache-invalidate-{self.namespace}",
+            daemon=True,
+        )
+        self._subscriber.start()
+
+    def _after_fork(self):
+        """В дочернем процессе: свои соединения и поток подписки
+
+        Сокеты клиентов общие с родителем, поэтому клиенты создаются заново
+        (redis-py не закрывает сокеты, открытые другим процессом).
+        """
+        self._redis = self._redis_loop = None
+        self._retry_at = 0.0
+        if self.near is not None:
+            # Поток подписки в потомок не переходит, а пока его нет, сообщения
+            # об изменениях терялись: копия заводится заново вместе с потоком
+            self.near = None
+            self.start()
+
+    async def pipeline(self, build: Callable[[Pipeline], Any], fallback=None):
+        """Выполняет команды за один обмен; при сетевой ошибке возвращает fallback
+
+        build добавляет команды в pipeline redis-py; ключи передаются через
+        key(), чтобы попасть в пространство имен кэша.
+        """
+        if time.monotonic() < self._retry_at:
+            return fallback
+        try:
+            pipe = self._client().pipeline(transaction=False)
+            build(pipe)
+            return await pipe.execute()
+        except CACHE_ERRORS:
+            self.errors += 1
+            self._retry_at = time.monotonic() + CACHE_RETRY_SECONDS
+            return fallback
+
+    def key(self, key: str) -> str:
+        """Полное имя ключа в Redis"""
+        return self._prefix + key
+
+    def _ttl_ms(self, ttl: Optional[float]) -> int:
+        return max(1, int((self.ttl if ttl is None else ttl) * 1000))
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found = self.near.get_many(keys) if self.near is not None else {}
+        missing = [key for key in keys if key not in found]
+        if missing:
+            replies = await self.pipeline(
+                lambda pipe: pipe.mget([self.key(key) for key in missing]), [[]]
+            )
+            fetched = {
+                key: _loads(data)
+                for key, data in zip(missing, replies[0])
+                if data is not None
+            }
+            if fetched and self.near is not None:
+                self.near.set_many(fetched)
+            found.update(fetched)
+        # Статистика общего кэша: попадание в локальную копию - тоже попадание
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None):
+        ttl_ms = self._ttl_ms(ttl)
+
+        def build(pipe):
+            for key, value in mapping.items():
+                pipe.set(self.key(key), _dumps(value), px=ttl_ms)
+
+        await self.pipeline(build)
+        if self.near is not None:
+            self.near.set_many(mapping, min(self.near.ttl, ttl_ms / 1000))
+
+    async def delete_many(self, keys: Iterable[str]):
+        """Удаляет ключи и сообщает остальным воркерам сбросить локальные копии"""
+        keys = list(keys)
+        if not keys:
+            return
+        if self.near is not None:
+            for key in keys:
+                self.near.delete(key)
+
+        def build(pipe):
+            pipe.delete(*map(self.key, keys))
+            for key in keys:
+                pipe.publish(self._channel, key)
+
+        await self.pipeline(build)
+
+    async def incr(self, key: str) -> int:
+        replies = await self.pipeline(lambda pipe: pipe.incr(self.key(key)))
+        return replies[0] if replies else 0
+
+    async def get_counter(self, key: str) -> int:
+        replies = await self.pipeline(lambda pipe: pipe.get(self.key(key)))
+        return int(replies[0]) if replies and replies[0] is not None else 0
+
+    async def clear(self):
+        cursor = 0
+        while True:
+            replies = await self.pipeline(
+                lambda pipe: pipe.scan(cursor, match=f"{self._prefix}*", count=1000)
+            )
+            if not replies:
+                break
+            cursor, keys = replies[0]
+            if keys:
+                await self.pipeline(lambda pipe: pipe.delete(*keys))
+            if not cursor:
+                break
+        if self.near is not None:
+            self.near.clear()
+        await self.pipeline(lambda pipe: pipe.publish(self._channel, "*"))
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "near_cache": self.near.stats() if self.near is not None else None,
+        }
+
+    def invalidate_sync(self, keys: Optional[Iterable[str]] = None):
+        """Сброс из синхронного кода (синхронная сессия, скрипты)
+
+        Клиенты redis.asyncio привязаны к event loop, поэтому здесь
+        синхронный клиент на один вызов; он закрывается сразу.
+        """
+        keys = None if keys is None else list(keys)
+        if keys == []:
+            return
+        if self.near is not None:
+            if keys is None:
+                self.near.clear()
+            else:
+                for key in keys:
+                    self.near.delete(key)
+        try:
+            with Redis.from_url(
+                self.url,
+                socket_timeout=CACHE_TIMEOUT_SECONDS,
+                socket_connect_timeout=CACHE_TIMEOUT_SECONDS,
+            ) as client:
+                pipe = client.pipeline(transaction=False)
+                if keys is None:
+                    found = list(client.scan_iter(match=f"{self._prefix}*", count=1000))
+                    if found:
+                        pipe.delete(*found)
+                    pipe.publish(self._channel, "*")
+                else:
+                    pipe.delete(*map(self.key, keys))
+                    for key in keys:
+                        pipe.publish(self._channel, key)
+                pipe.execute()
+        except CACHE_ERRORS:
+            self.errors += 1
+
+    def _listen_invalidations(self, near: InProcessCache, stop: threading.Event):
+        # Синхронный клиент в своем потоке: ожидание сообщений не занимает
+        # event loop. После обрыва локальная копия сбрасывается целиком,
+        # ведь часть сообщений могла потеряться
+        while not stop.is_set():
+            client = Redis.from_url(
+                self.url, socket_connect_timeout=CACHE_TIMEOUT_SECONDS
+            )
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                while not stop.is_set():
+                    message = pubsub.get_message(timeout=CACHE_RETRY_SECONDS)
+                    if message is None:
+                        continue
+                    key = message["data"].decode()
+                    if key == "*":
+                        near.clear()
+                    else:
+                        near.delete(key)
+            except CACHE_ERRORS:
+                near.clear()
+            finally:
+                pubsub.close()
+                client.close()
+            stop.wait(CACHE_RETRY_SECONDS)
+
+    async def close(self):
+        """Останавливает подписку и закрывает соединения
+
+        Кэшем можно пользоваться и дальше, без локальной копии: клиент
+        заведется заново при следующем обращении.
+        """
+        self.near = None
+        self._stop.set()
+        subscriber, self._subscriber = self._subscriber, None
+        if subscriber is not None and subscriber.is_alive():
+            # Поток замечает остановку не позже чем через CACHE_RETRY_SECONDS
+            await asyncio.to_thread(
+                subscriber.join, CACHE_RETRY_SECONDS + CACHE_TIMEOUT_SECONDS
+            )
+        if self._redis is not None and self._redis_loop is asyncio.get_running_loop():
+            await self._redis.aclose()
+        self._redis = self._redis_loop = None
+
+
+def start_caches():
+    """Запускает подписки общих кэшей (lifespan воркера, после fork)"""
+    for cache in list(_redis_caches):
+        cache.start()
+
+
+async def close_caches():
+    for cache in list(_redis_caches):
+        await cache.close()
+
+
+def create_cache(
+    namespace: str, maxsize: int, ttl: float, near_cache: bool = False
+) -> CacheBackend:
+    """Кэш выбранного в CACHE_BACKEND типа
+
+    near_cache - держать локальную копию горячих ключей перед общим кэшем.
+    """
+    if CACHE_BACKEND == "redis":
+        return RedisCache(
+            CACHE_URL,
+            namespace,
+            ttl,
+            near_cache_size=min(CACHE_NEAR_SIZE, maxsize) if near_cache else 0,
+        )
+    return MemoryCache(maxsize, ttl)
+
+
+class SingleFlight:
+    """Склеивает одновременные промахи по одному ключу в одну загрузку
+
+    Пока первый запрос грузит значение, остальные ждут его результат, а не
+    идут в БД сами (защита от "стада" после истечения или сброса ключа).
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._in_flight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Отменили загружавший запрос, а не нас: грузим сами
+                return await loader()
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # ожидающих может не быть, без предупреждения
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
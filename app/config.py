@@ -0,0 +1,18 @@
+"""Переменные окружения из .env
+
+Настройки модулей - константы из os.getenv, вычисляемые при импорте модуля,
+поэтому .env загружается раньше них: при импорте пакета app (app/__init__.py),
+один раз на процесс.
+"""
+
+from dotenv import load_dotenv
+
+_loaded = False
+
+
+def load_environment():
+    """Загружает .env (уже заданные переменные окружения не перезаписываются)"""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
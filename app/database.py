@@ -1,27 +1,150 @@
+import asyncio
 import os
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# Загружаем переменные окружения
-load_dotenv()
+from app.cache import create_cache
 
 # Безопасное получение URL базы данных
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Реплика для чтения. Без READ_DATABASE_URL чтение идет в основную БД.
+# После записи пользователь READ_YOUR_WRITES_SECONDS читает из основной БД,
+# чтобы не получить устаревшие данные из отстающей реплики
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_MAX_USERS = int(os.getenv("READ_YOUR_WRITES_MAX_USERS", "10000"))
+
+# Пул соединений для серверных СУБД (PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Сколько соединений открыть при старте, чтобы первые запросы не ждали
+# подключения к БД
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(min(DB_POOL_SIZE, 4))))
+
+# SQLite: WAL позволяет читателям не ждать писателя, остальное - кэш страниц,
+# mmap и ожидание блокировки вместо мгновенного "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # в КиБ
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+
+
+def to_async_url(url: str) -> str:
+    """Подставляет async-драйвер: aiosqlite для SQLite, asyncpg для PostgreSQL"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL)
 )
 
+
+def engine_options(url: str) -> dict:
+    """Параметры create_engine в зависимости от СУБД"""
+    if url.startswith("sqlite"):
+        # SQLite-соединения используются из разных потоков
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """Настраивает каждое новое SQLite-соединение"""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def configure_engine(sync_engine, url: str):
+    if url.startswith("sqlite"):
+        event.listen(sync_engine, "connect", set_sqlite_pragmas)
+
+
+# Синхронный движок нужен только для создания схемы и служебных скриптов
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL)
+)
+configure_engine(engine, SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Все эндпоинты работают через async-движок и не занимают потоки threadpool
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL)
+)
+configure_engine(async_engine.sync_engine, ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+if READ_DATABASE_URL:
+    ASYNC_READ_DATABASE_URL = to_async_url(READ_DATABASE_URL)
+    read_engine = create_async_engine(
+        ASYNC_READ_DATABASE_URL, **engine_options(ASYNC_READ_DATABASE_URL)
+    )
+    configure_engine(read_engine.sync_engine, ASYNC_READ_DATABASE_URL)
+else:
+    read_engine = async_engine
+ReadSessionLocal = async_sessionmaker(
+    read_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
+# Отметки о недавней записи живут в кэше (CACHE_BACKEND): с общим кэшем
+# окно действует, даже если запись и чтение попали в разные воркеры
+recent_writers = create_cache(
+    "recent_writers", READ_YOUR_WRITES_MAX_USERS, READ_YOUR_WRITES_SECONDS
+)
+
+
+def read_replica_enabled() -> bool:
+    return read_engine is not async_engine
+
+
+async def mark_user_write(user_id: int):
+    """Открывает окно read-your-writes после изменения данных пользователем"""
+    if not read_replica_enabled() or READ_YOUR_WRITES_SECONDS <= 0:
+        # Без реплики все чтение и так идет в основную БД; окно 0 - выключено
+        # (общий кэш не хранит ключи с нулевым TTL, а округляет его вверх)
+        return
+    await recent_writers.set(str(user_id), True, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+async def wrote_recently(user_id: int) -> bool:
+    return await recent_writers.get(str(user_id)) is not None
+
+
+async def warm_up_pool(async_engine, size: int = DB_POOL_WARMUP):
+    """Открывает size соединений одновременно; после проверки они остаются в пуле"""
+
+    async def open_connection():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(open_connection() for _ in range(size)))
+
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,19 +1,146 @@
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
 
 from app import models
 from app.auth import verify_token
-from app.database import get_db
+from app.cache import SingleFlight, create_cache
+from app.database import (
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    get_db,
+    read_replica_enabled,
+    wrote_recently,
+)
 from app.logger import log_security_event
+from app.metrics import set_request_user
 
 security = HTTPBearer(auto_error=False)
 
+# Кэш аутентифицированных пользователей: JWT уже содержит user_id,
+# поэтому запись из users не нужно перечитывать на каждый запрос.
+# При CACHE_BACKEND=redis кэш общий, и смена роли видна всем воркерам
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+user_cache = create_cache(
+    "users", USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, near_cache=True
+)
+_user_loads = SingleFlight()
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Снимок пользователя, достаточный для авторизации запроса"""
+
+    id: int
+    email: str
+    role: str
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+
+    def to_cache(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_cache(cls, data: dict) -> "CurrentUser":
+        created_at = data["created_at"]
+        if isinstance(created_at, str):  # общий кэш хранит JSON
+            created_at = datetime.fromisoformat(created_at)
+        return cls(**{**data, "created_at": created_at})
+
+
+async def invalidate_user(user_id: int):
+    """Сбрасывает пользователя из кэша (смена роли, блокировка, удаление)"""
+    await user_cache.delete(str(user_id))
+
+
+# Измененные пользователи копятся в сессии при flush, а из кэша удаляются
+# только после коммита: до него параллельный запрос еще читает старую
+# строку и вернул бы ее в кэш на весь USER_CACHE_TTL_SECONDS
+_CHANGED_USERS = "changed_users"
+_ALL_USERS = "*"
+_CACHED_FIELDS = ("email", "role", "is_active")
+
+
+def _changed_users(session: Session) -> set:
+    return session.info.setdefault(_CHANGED_USERS, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = _changed_users(session)
+    for obj in session.dirty:
+        if isinstance(obj, models.User):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in _CACHED_FIELDS):
+                changed.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, models.User):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    # update(User) / delete(User) через сессию: какие строки затронуты,
+    # неизвестно, поэтому после коммита сбрасывается весь кэш
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is models.User for mapper in orm_execute_state.all_mappers
+    ):
+        _changed_users(orm_execute_state.session).add(_ALL_USERS)
+
+
+async def _invalidate_users(keys: Optional[list]):
+    if keys is None:
+        await user_cache.clear()
+    else:
+        await user_cache.delete_many(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    changed = session.info.pop(_CHANGED_USERS, None)
+    if not changed:
+        return
+    keys = None if _ALL_USERS in changed else [str(user_id) for user_id in changed]
+    try:
+        # AsyncSession вызывает события внутри своего greenlet: кэш
+        # сбрасывается до того, как await commit() вернет управление
+        await_only(_invalidate_users(keys))
+    except MissingGreenlet:
+        # Синхронная сессия (скрипты, тесты): свой event loop здесь не
+        # заводим, в потоке уже может работать чужой
+        user_cache.invalidate_sync(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop(_CHANGED_USERS, None)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> models.User:
+    db: AsyncSession = Depends(get_db),
+) -> CurrentUser:
     """Получает текущего пользователя из JWT токена"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,35 +149,76 @@ async def get_current_user(
     )
 
     if credentials is None:
-        log_security_event("MISSING_TOKEN", None, "no_authorization_header")
+        log_security_event("MISSING_TOKEN", reason="no_authorization_header")
         raise credentials_exception
 
     token = credentials.credentials
     payload = verify_token(token)
     if payload is None:
-        log_security_event("INVALID_TOKEN", None, "token_verification_failed")
+        log_security_event("INVALID_TOKEN", reason="token_verification_failed")
         raise credentials_exception
 
     user_id_str: str = payload.get("sub")
     if user_id_str is None:
-        log_security_event("INVALID_TOKEN_PAYLOAD", None, "missing_sub_field")
+        log_security_event("INVALID_TOKEN_PAYLOAD", reason="missing_sub_field")
         raise credentials_exception
 
     try:
         user_id = int(user_id_str)
     except ValueError:
-        log_security_event("INVALID_USER_ID", None, f"user_id_str={user_id_str}")
+        log_security_event("INVALID_USER_ID", user_id_str=user_id_str)
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        log_security_event("USER_NOT_FOUND", user_id, "user_id_from_token_not_in_db")
+    cached = await user_cache.get(str(user_id))
+    if cached is not None:
+        set_request_user(user_id)
+        return CurrentUser.from_cache(cached)
+
+    async def load_user() -> Optional[CurrentUser]:
+        user = await db.get(models.User, user_id)
+        if user is None:
+            return None
+        loaded = CurrentUser.from_model(user)
+        await user_cache.set(str(user_id), loaded.to_cache())
+        return loaded
+
+    # Одновременные запросы одного пользователя читают users один раз
+    current_user = await _user_loads.do(str(user_id), load_user)
+    if current_user is None:
+        log_security_event("USER_NOT_FOUND", user_id, reason="user_not_in_db")
         raise credentials_exception
+    set_request_user(user_id)
+    return current_user
+
+
+READS_OWN_WRITES = "reads_own_writes"
+
+
+async def get_read_db(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Сессия для чтения: реплика, либо основная БД сразу после записи"""
+    session_factory = ReadSessionLocal
+    if read_replica_enabled():
+        payload = verify_token(credentials.credentials) if credentials else None
+        user_id = str(payload.get("sub", "")) if payload else ""
+        if user_id.isdigit() and await wrote_recently(int(user_id)):
+            session_factory = AsyncSessionLocal
+    async with session_factory() as db:
+        db.info[READS_OWN_WRITES] = session_factory is AsyncSessionLocal
+        yield db
+
+
+def reads_own_writes(db: AsyncSession) -> bool:
+    """Сессия открыта на основной БД в окне read-your-writes
 
-    return user
+    Такой запрос не должен ни брать ответ из кэша, ни класть в него: в кэше
+    может лежать страница из отстающей реплики.
+    """
+    return db.info.get(READS_OWN_WRITES, False)
 
 
-def require_owner(current_user: models.User, target_user_id: int):
+def require_owner(current_user: CurrentUser, target_user_id: int):
     """Проверяет, что пользователь является владельцем или модератором"""
     if current_user.id != target_user_id and current_user.role != "moderator":
         raise HTTPException(
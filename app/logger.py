@@ -1,44 +1,420 @@
+import atexit
+import gzip
 import logging
+import logging.handlers
 import os
+import queue
+import re
+import shutil
 import sys
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
-# Создаем папку для логов если нет
-if not os.path.exists("logs"):
-    os.makedirs("logs")
+import orjson
 
 # Настройка формата логов
 log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-# Базовый логгер
-logging.basicConfig(
-    level=logging.INFO,
-    format=log_format,
-    handlers=[
-        logging.FileHandler(f"logs/app_{datetime.now().strftime('%Y%m%d')}.log"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+# Запись в файл и stdout идет из отдельного потока через ограниченную очередь.
+# LOG_QUEUE_POLICY: drop - при переполнении запись отбрасывается и считается,
+# block - поток запроса ждет освобождения места в очереди
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop")
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+
+# Ротация файла логов по размеру и по времени, старые файлы сжимаются gzip
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_ROTATE_INTERVAL_SECONDS = int(os.getenv("LOG_ROTATE_INTERVAL_SECONDS", "86400"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+# Имя файла без .log. Каждый процесс ротирует и сжимает только свой файл,
+# поэтому воркеры gunicorn пишут в разные файлы (app-0.log, app-1.log, ...)
+LOG_FILE_NAME = os.getenv("LOG_FILE_NAME", "app")
+
+# LOG_FORMAT=json - одна JSON-строка на событие вместо текстовой строки
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+
+def _user_info(user_id) -> str:
+    return f"user_id={user_id}" if user_id else "anonymous"
+
+
+def _details(details: dict) -> str:
+    return ", ".join(f"{name}={value}" for name, value in details.items())
+
+
+_TEXT_TEMPLATES = {
+    "SECURITY": lambda f: (
+        f"SECURITY - {f['event_type']} - {_user_info(f['user_id'])} - "
+        + _details(f["details"])
+    ),
+    "USER_ACTION": lambda f: (
+        f"USER_ACTION - {f['action']} - user_id={f['user_id']} - "
+        + _details(f["details"])
+    ),
+    "API": lambda f: (
+        f"API - {f['method']} {f['path']} - {_user_info(f['user_id'])} - "
+        + (f"status={f['status']}" if f["status"] else "")
+        + (f" - duration_ms={f['duration_ms']:.2f}" if f["duration_ms"] else "")
+    ),
+    "SLOW_QUERY": lambda f: (
+        f"SLOW_QUERY - {f['duration_ms']:.2f}ms - {f['statement']}"
+    ),
+    "STATS_DRIFT": lambda f: f"STATS_DRIFT - {f['drift']}",
+    "STARTUP": lambda f: (
+        f"STARTUP - ready in {f['ready_seconds']:.3f}s - "
+        + ", ".join(f"{name}={value:.3f}s" for name, value in f["steps"].items())
+    ),
+    "QUERY_BUDGET": lambda f: (
+        f"QUERY_BUDGET - {f['method']} {f['path']} - "
+        f"queries={f['queries']} - limit={f['limit']}"
+    ),
+}
+
+
+class LogEvent:
+    """Событие лога: строка собирается только в потоке слушателя при записи"""
+
+    __slots__ = ("kind", "fields")
+
+    def __init__(self, kind: str, **fields):
+        self.kind = kind
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return _TEXT_TEMPLATES[self.kind](self.fields)
+
+
+class JsonFormatter(logging.Formatter):
+    """Сериализует запись в одну JSON-строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, LogEvent):
+            payload["event"] = record.msg.kind
+            payload.update(record.msg.fields)
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(payload, default=str).decode()
+
+
+class BatchFlushMixin:
+    """Хэндлер не сбрасывает поток после каждой записи, это делает слушатель"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        # Как и logging.shutdown, не падаем на уже закрытом потоке
+        try:
+            super().flush()
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class CompressingRotatingFileHandler(
+    BatchFlushMixin, logging.handlers.BaseRotatingHandler
+):
+    """Пишет в {name}.log, ротирует по размеру или времени и сжимает архивы в фоне
+
+    Список файлов ведется в памяти, чтобы /logs/health не сканировал каталог.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 0,
+        interval: int = 0,
+        backup_count: int = 0,
+        name: str = "app",
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.file_name = name
+        self.archive_pattern = re.compile(rf"^{re.escape(name)}_[0-9_]+\.log(\.gz)?$")
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self._archives = sorted(
+            entry
+            for entry in os.listdir(directory)
+            if self.archive_pattern.match(entry)
+        )
+        self._index_lock = threading.Lock()
+        self._compressor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="log-compress"
+        )
+        super().__init__(os.path.join(directory, f"{name}.log"), "a", encoding="utf-8")
+        self._rollover_at = time.time() + interval if interval else None
+
+        # Несжатые архивы от прошлых запусков дожимаем в фоне
+        for name in list(self._archives):
+            if name.endswith(".log"):
+                self._compressor.submit(self._compress, name)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self._rollover_at is not None and time.time() >= self._rollover_at:
+            return True
+        return self.max_bytes > 0 and self.stream.tell() >= self.max_bytes
+
+    def doRollover(self):
+        self.flush_batch()
+        self.stream.close()
+        name = f"{self.file_name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.log"
+        if os.path.getsize(self.baseFilename) > 0:
+            os.rename(self.baseFilename, os.path.join(self.directory, name))
+            with self._index_lock:
+                self._archives.append(name)
+            self._compressor.submit(self._compress, name)
+        self.stream = self._open()
+        if self.interval:
+            self._rollover_at = time.time() + self.interval
+
+    def _compress(self, name: str):
+        with self._index_lock:
+            if name not in self._archives:
+                return  # архив уже удален по лимиту хранения
+        source = os.path.join(self.directory, name)
+        with open(source, "rb") as src, gzip.open(f"{source}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+        with self._index_lock:
+            self._archives[self._archives.index(name)] = f"{name}.gz"
+            expired = self._archives[: -self.backup_count] if self.backup_count else []
+            del self._archives[: len(expired)]
+        for expired_name in expired:
+            try:
+                os.remove(os.path.join(self.directory, expired_name))
+            except FileNotFoundError:
+                pass
+
+    def log_files(self) -> list:
+        """Текущий файл и архивы, от новых к старым"""
+        with self._index_lock:
+            return [os.path.basename(self.baseFilename), *reversed(self._archives)]
+
+    def close(self):
+        super().close()
+        self._compressor.shutdown(wait=True)
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler с явной политикой переполнения и счетчиком потерь"""
+
+    def __init__(self, log_queue: queue.Queue, policy: str = "drop"):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Запись не покидает процесс, поэтому форматирование откладывается
+        # до потока слушателя, а не выполняется в потоке запроса
+        return record
+
+
+class BatchQueueListener(logging.handlers.QueueListener):
+    """Разбирает очередь пачками и сбрасывает хэндлеры один раз на пачку"""
+
+    def __init__(self, log_queue, *handlers, batch_size: int = 256, **kwargs):
+        super().__init__(log_queue, *handlers, **kwargs)
+        self.batch_size = batch_size
+
+    def _monitor(self):
+        has_task_done = hasattr(self.queue, "task_done")
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    self.handle(record)
+                if has_task_done:
+                    self.queue.task_done()
+
+            for handler in self.handlers:
+                getattr(handler, "flush_batch", handler.flush)()
+            if stop:
+                break
+
+    def enqueue_sentinel(self):
+        # Блокирующая вставка: при полной очереди маркер остановки не теряется
+        self.queue.put(self._sentinel)
+
+
+log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = BoundedQueueHandler(log_queue, policy=LOG_QUEUE_POLICY)
+file_handler = None
+_listener = None
+
+
+def setup_logging():
+    """Запускает фоновую запись логов в файл и stdout"""
+    global _listener, file_handler
+    if _listener is not None:
+        return
+
+    formatter = (
+        JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(log_format)
+    )
+    file_handler = CompressingRotatingFileHandler(
+        LOG_DIR,
+        max_bytes=LOG_MAX_BYTES,
+        interval=LOG_ROTATE_INTERVAL_SECONDS,
+        backup_count=LOG_BACKUP_COUNT,
+        name=LOG_FILE_NAME,
+    )
+    handlers = [file_handler, BatchStreamHandler(sys.stdout)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Базовый логгер: в потоке запроса только постановка записи в очередь.
+    # Не basicConfig: он ничего не делает, если у корневого логгера уже есть
+    # хэндлеры (logconfig сервера, pytest)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    if queue_handler not in root.handlers:
+        root.addHandler(queue_handler)
+
+    _listener = BatchQueueListener(
+        log_queue, *handlers, batch_size=LOG_BATCH_SIZE, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Дописывает все записи из очереди и останавливает фоновый поток"""
+    global _listener
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def get_log_files() -> list:
+    """Файлы логов из индекса файлового хэндлера"""
+    return file_handler.log_files() if file_handler is not None else []
+
+
+def get_logging_stats() -> dict:
+    """Состояние очереди логирования"""
+    return {
+        "queue_size": log_queue.qsize(),
+        "queue_capacity": LOG_QUEUE_SIZE,
+        "policy": queue_handler.policy,
+        "dropped_records": queue_handler.dropped,
+    }
+
 
 logger = logging.getLogger("suggestion_box")
 
 
 # SEC-NFR-007: Логирование security events
-def log_security_event(event_type: str, user_id: int = None, details: str = ""):
-    """Логирование событий безопасности"""
-    user_info = f"user_id={user_id}" if user_id else "anonymous"
-    logger.warning(f"SECURITY - {event_type} - {user_info} - {details}")
+def log_security_event(event_type: str, user_id: int = None, **details):
+    """Логирование событий безопасности
+
+    Подробности передаются именованными аргументами и форматируются только
+    при записи: log_security_event("LOGIN_FAILED", user_id, email=email)
+    """
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            LogEvent(
+                "SECURITY", event_type=event_type, user_id=user_id, details=details
+            )
+        )
 
 
-def log_user_action(action: str, user_id: int, details: str = ""):
+def log_user_action(action: str, user_id: int, **details):
     """Логирование действий пользователей"""
-    logger.info(f"USER_ACTION - {action} - user_id={user_id} - {details}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            LogEvent("USER_ACTION", action=action, user_id=user_id, details=details)
+        )
+
+
+def log_slow_query(statement: str, duration_ms: float):
+    """Логирование медленных SQL-запросов"""
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            LogEvent("SLOW_QUERY", statement=statement, duration_ms=duration_ms)
+        )
+
+
+def log_query_budget_exceeded(method: str, path: str, queries: int, limit: int):
+    """Логирование запросов, сделавших слишком много обращений к БД"""
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            LogEvent(
+                "QUERY_BUDGET", method=method, path=path, queries=queries, limit=limit
+            )
+        )
+
+
+def log_stats_drift(drift: dict):
+    """Логирование расхождения счетчиков статусов с таблицей предложений"""
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(LogEvent("STATS_DRIFT", drift=drift))
+
+
+def log_startup(ready_seconds: float, steps: dict):
+    """Логирование времени запуска воркера по этапам"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(LogEvent("STARTUP", ready_seconds=ready_seconds, steps=steps))
 
 
 def log_api_request(
-    method: str, path: str, user_id: int = None, status_code: int = None
+    method: str,
+    path: str,
+    user_id: int = None,
+    status_code: int = None,
+    duration_ms: float = None,
 ):
     """Логирование API запросов"""
-    user_info = f"user_id={user_id}" if user_id else "anonymous"
-    status_info = f"status={status_code}" if status_code else ""
-    logger.info(f"API - {method} {path} - {user_info} - {status_info}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            LogEvent(
+                "API",
+                method=method,
+                path=path,
+                user_id=user_id,
+                status=status_code,
+                duration_ms=duration_ms,
+            )
+        )
@@ -1,43 +1,138 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Optional
-
-from fastapi import Depends, FastAPI, HTTPException, status
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-
-from app.auth import create_access_token, get_password_hash, verify_password
-from app.database import engine, get_db
-from app.dependencies import get_current_user, require_owner
-from app.logger import log_api_request, log_security_event, log_user_action
-from app.models import Base
+from typing import List, Literal, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import (
+    create_access_token,
+    get_hash_metrics,
+    get_password_hash_async,
+    shutdown_hash_pool,
+    token_cache,
+    verify_login_password,
+    warm_up_hashing,
+)
+from app.bulk import export_suggestions, import_ndjson
+from app.cache import close_caches, start_caches
+from app.database import (
+    async_engine,
+    engine,
+    get_db,
+    mark_user_write,
+    read_engine,
+    warm_up_pool,
+)
+from app.dependencies import (
+    CurrentUser,
+    get_current_user,
+    get_read_db,
+    reads_own_writes,
+    require_owner,
+    user_cache,
+)
+from app.logger import (
+    LOG_DIR,
+    get_log_files,
+    get_logging_stats,
+    log_security_event,
+    log_startup,
+    log_user_action,
+    setup_logging,
+    stop_logging,
+)
+from app.metrics import MetricsMiddleware, render_prometheus, startup
+from app.migrate import prepare_schema
 from app.models import Suggestion as SuggestionModel
 from app.models import User as UserModel
+from app.pagination import after_cursor, decode_cursor, next_cursor
+from app.rate_limit import RateLimitMiddleware
+from app.response_cache import (
+    bump_generation,
+    current_generation,
+    etag_matches,
+    make_etag,
+    page_key,
+    response_cache,
+    response_loads,
+)
+from app.responses import (
+    SUGGESTION_FIELDS,
+    json_response,
+    parse_fields,
+    rows_to_json,
+    suggestion_columns,
+    suggestion_to_json,
+)
 from app.schemas import Suggestion as SuggestionSchema
 from app.schemas import SuggestionCreate, SuggestionUpdate, Token
 from app.schemas import User as UserSchema
 from app.schemas import UserCreate, UserLogin
+from app.search import check_search_window, search_query
+from app.stats import STATS_RECONCILE_SECONDS, get_status_counts, reconcile_periodically
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Подготовка воркера до первого запроса, по порядку и один раз
+
+    Импорт модулей ничего не делает с БД, файлами логов и пулами: все это
+    здесь, с замером каждого этапа (GET /metrics, app_startup_*).
+    """
+    startup.mark("import")
+    with startup.step("logging"):
+        setup_logging()
+    with startup.step("caches"):
+        # Подписка на сброс локальных копий общего кэша (CACHE_BACKEND=redis)
+        start_caches()
+    with startup.step("schema"):
+        # Миграции синхронные, event loop на это время не блокируем
+        await asyncio.to_thread(prepare_schema, engine)
+    with startup.step("db_pool"):
+        await warm_up_pool(async_engine)
+        if read_engine is not async_engine:
+            await warm_up_pool(read_engine)
+    with startup.step("password_hashing"):
+        await warm_up_hashing()
+    log_startup(startup.mark_ready(), startup.steps)
+
+    reconcile_task = None
+    if STATS_RECONCILE_SECONDS > 0:
+        reconcile_task = asyncio.create_task(reconcile_periodically(async_engine))
+    yield
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    shutdown_hash_pool()
+    await close_caches()
+    stop_logging()
 
-# Создаем таблицы в базе данных
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Suggestion Box MVP",
     description="API для системы предложений с анонимными отзывами",
     version="0.1.0",
+    lifespan=lifespan,
 )
+# Метрики снаружи, чтобы ответы 429 тоже попадали в них
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 # ==================== ЭНДПОИНТЫ АУТЕНТИФИКАЦИИ ====================
 
 
 @app.post("/auth/register", response_model=UserSchema)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Регистрация нового пользователя"""
     try:
         # Валидация пароля
         if len(user_data.password) < 8:
             log_security_event(
-                "REGISTER_PASSWORD_TOO_SHORT", None, f"email={user_data.email}"
+                "REGISTER_PASSWORD_TOO_SHORT", None, email=user_data.email
             )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -45,35 +140,31 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
 
         # Проверяем существование пользователя
-        existing_user = (
-            db.query(UserModel).filter(UserModel.email == user_data.email).first()
+        existing_user = await db.scalar(
+            select(UserModel).where(UserModel.email == user_data.email)
         )
         if existing_user:
-            log_security_event(
-                "REGISTER_DUPLICATE_EMAIL", None, f"email={user_data.email}"
-            )
+            log_security_event("REGISTER_DUPLICATE_EMAIL", None, email=user_data.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
             )
 
-        # Создаем пользователя
-        hashed_password = get_password_hash(user_data.password)
+        # Создаем пользователя (Argon2 считается в пуле процессов)
+        hashed_password = await get_password_hash_async(user_data.password)
         db_user = UserModel(email=user_data.email, hashed_password=hashed_password)
 
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
 
-        log_user_action("REGISTER_SUCCESS", db_user.id, f"email={user_data.email}")
-        log_api_request("POST", "/auth/register", db_user.id, 200)
+        log_user_action("REGISTER_SUCCESS", db_user.id, email=user_data.email)
 
         return db_user
 
     except HTTPException:
         raise
     except Exception as e:
-        log_security_event("REGISTER_ERROR", None, f"error={str(e)}")
+        log_security_event("REGISTER_ERROR", None, error=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during registration",
@@ -81,14 +172,18 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Аутентификация пользователя и получение JWT токена"""
     try:
-        user = db.query(UserModel).filter(UserModel.email == user_data.email).first()
+        user = await db.scalar(
+            select(UserModel).where(UserModel.email == user_data.email)
+        )
 
-        if not user or not verify_password(user_data.password, user.hashed_password):
+        if not await verify_login_password(
+            user_data.password, user.hashed_password if user else None
+        ):
             user_id = user.id if user else None
-            log_security_event("LOGIN_FAILED", user_id, f"email={user_data.email}")
+            log_security_event("LOGIN_FAILED", user_id, email=user_data.email)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -98,14 +193,13 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
         access_token = create_access_token(data={"sub": str(user.id)})
 
         log_user_action("LOGIN_SUCCESS", user.id)
-        log_api_request("POST", "/auth/login", user.id, 200)
 
         return {"access_token": access_token, "token_type": "bearer"}
 
     except HTTPException:
         raise
     except Exception as e:
-        log_security_event("LOGIN_ERROR", None, f"error={str(e)}")
+        log_security_event("LOGIN_ERROR", None, error=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during login",
@@ -116,36 +210,95 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     """Корневой эндпоинт - проверка работы сервера"""
-    log_api_request("GET", "/", None, 200)
     return {"message": "Suggestion Box MVP работает!"}
 
 
 # ==================== ЭНДПОИНТЫ ПРЕДЛОЖЕНИЙ ====================
+# response_model остается для документации; сами ответы собираются из строк
+# выборки и сериализуются orjson (app/responses.py) без повторной проверки
 
 
 @app.get("/suggestions", response_model=List[SuggestionSchema])
-def get_suggestions(
-    skip: int = 0,
-    limit: int = 100,
-    status: Optional[str] = None,
-    db: Session = Depends(get_db),
+async def get_suggestions(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    # Не status: имя закрыло бы модуль fastapi.status в обработчике ошибок
+    status_filter: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Получение списка предложений с возможностью фильтрации"""
-    try:
-        query = db.query(SuggestionModel)
-
-        if status:
-            query = query.filter(SuggestionModel.status == status)
+    """Получение списка предложений с возможностью фильтрации
+
+    Вместо skip можно передать cursor из заголовка X-Next-Cursor предыдущей
+    страницы: тогда выборка идет по индексу (created_at, id) без OFFSET.
+    fields=id,title,status оставляет в ответе только перечисленные поля;
+    остальные колонки (например, длинный text) не читаются из БД.
+    Ответ кэшируется до следующего изменения предложений. ETag - хэш ответа;
+    по If-None-Match с актуальным ETag возвращается 304, а пока страница в
+    кэше - и без обращения к БД.
+    limit больше 100 отклоняется с 422, а не урезается: клиент, листающий
+    skip += limit, иначе молча пропустил бы строки.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    field_names = parse_fields(fields)
+    cache_key = (status_filter, cursor, 0 if cursor else skip, limit, field_names)
+
+    async def load_page(generation: Optional[int] = None, keys=()):
+        # Только нужные колонки (плюс created_at и id для курсора),
+        # строки не проходят через identity map сессии
+        names = field_names or SUGGESTION_FIELDS
+        query = select(*suggestion_columns(dict.fromkeys((*names, "created_at", "id"))))
+
+        if status_filter:
+            query = query.where(SuggestionModel.status == status_filter)
+
+        query = query.order_by(SuggestionModel.created_at, SuggestionModel.id)
+        if position:
+            query = query.where(after_cursor(position))
+        else:
+            query = query.offset(skip)
+
+        suggestions = (await db.execute(query.limit(limit))).all()
+        body = rows_to_json(suggestions, names)
+        cursor_value = next_cursor(suggestions, limit) or ""
+        page = (body, cursor_value, make_etag(body, cursor_value))
+        # Пока шел запрос, список могли изменить: такой ответ не кэшируем
+        if keys and generation == await current_generation():
+            await response_cache.set_many(dict(zip(keys, page)))
+        return page
 
-        suggestions = query.offset(skip).limit(limit).all()
-
-        log_api_request("GET", "/suggestions", None, 200)
-        return suggestions
+    try:
+        if reads_own_writes(db):
+            # Автор только что писал: страница из основной БД, мимо кэша
+            body, cursor_value, etag = await load_page()
+        else:
+            generation = await current_generation()
+            page = page_key(generation, cache_key)
+            keys = [f"{page}:body", f"{page}:cursor", f"{page}:etag"]
+            cached = await response_cache.get_many(keys)
+            if len(cached) == len(keys):
+                body, cursor_value, etag = (cached[key] for key in keys)
+            else:
+                # Одновременные промахи по одной странице выполняют один запрос
+                body, cursor_value, etag = await response_loads.do(
+                    page, lambda: load_page(generation, keys)
+                )
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        headers = {"ETag": etag}
+        if cursor_value:
+            headers["X-Next-Cursor"] = cursor_value
+
+        return json_response(body, headers)
 
     except Exception as e:
-        log_security_event("GET_SUGGESTIONS_ERROR", None, f"error={str(e)}")
+        log_security_event("GET_SUGGESTIONS_ERROR", None, error=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error while fetching suggestions",
@@ -153,10 +306,10 @@ def get_suggestions(
 
 
 @app.post("/suggestions", response_model=SuggestionSchema)
-def create_suggestion(
+async def create_suggestion(
     suggestion: SuggestionCreate,
-    current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Создание нового предложения"""
     try:
@@ -165,73 +318,185 @@ def create_suggestion(
         )
 
         db.add(db_suggestion)
-        db.commit()
-        db.refresh(db_suggestion)
+        await db.commit()
+        await mark_user_write(current_user.id)
+        await bump_generation()
 
         log_user_action(
-            "SUGGESTION_CREATE", current_user.id, f"suggestion_id={db_suggestion.id}"
+            "SUGGESTION_CREATE", current_user.id, suggestion_id=db_suggestion.id
         )
-        log_api_request("POST", "/suggestions", current_user.id, 200)
 
-        return db_suggestion
+        return json_response(suggestion_to_json(db_suggestion))
 
     except Exception as e:
-        log_security_event(
-            "CREATE_SUGGESTION_ERROR", current_user.id, f"error={str(e)}"
-        )
+        log_security_event("CREATE_SUGGESTION_ERROR", current_user.id, error=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error while creating suggestion",
         )
 
 
+@app.get("/suggestions/stats")
+async def get_suggestion_stats(db: AsyncSession = Depends(get_read_db)):
+    """Число предложений по статусам
+
+    Берется из таблицы счетчиков, а не подсчетом по suggestions, поэтому
+    не зависит от размера таблицы.
+    """
+    counts = await get_status_counts(db)
+    return {"by_status": counts, "total": sum(counts.values())}
+
+
+@app.get("/suggestions/search", response_model=List[SuggestionSchema])
+async def search_suggestions(
+    q: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Полнотекстовый поиск по заголовку и тексту
+
+    Находятся предложения, содержащие все слова запроса; сначала самые
+    релевантные (совпадение в заголовке весит больше).
+    Ранжируются только SEARCH_MAX_CANDIDATES (по умолчанию 1000) самых новых
+    совпадений, более старые не находятся; skip + limit больше этого числа
+    отклоняется с 400.
+    """
+    check_search_window(skip, limit)
+    query = search_query(db.bind.dialect.name, q, suggestion_columns())
+    suggestions = (await db.execute(query.offset(skip).limit(limit))).all()
+
+    return json_response(rows_to_json(suggestions))
+
+
+@app.post("/suggestions/bulk")
+async def bulk_create_suggestions(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Массовое создание предложений из NDJSON
+
+    Каждая строка тела - объект {"title": ..., "text": ...}. Строки
+    вставляются пачками; ошибочные строки пропускаются и перечисляются
+    в ответе с номерами.
+    """
+    try:
+        result = await import_ndjson(db, request.stream(), current_user.id)
+    finally:
+        # Часть пачек могла закоммититься и до ошибки
+        await mark_user_write(current_user.id)
+        await bump_generation()
+
+    log_user_action(
+        "SUGGESTION_BULK_CREATE",
+        current_user.id,
+        inserted=result.inserted,
+        failed=result.failed,
+    )
+    return result.as_dict()
+
+
+@app.get("/suggestions/export")
+async def export_suggestions_stream(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Выгрузка всех предложений в NDJSON или CSV (только модератор)
+
+    Строки читаются серверным курсором и отдаются по мере чтения, поэтому
+    память не растет с размером выгрузки.
+    """
+    if current_user.role != "moderator":
+        log_security_event("UNAUTHORIZED_EXPORT", current_user.id, format=format)
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    log_user_action("SUGGESTION_EXPORT", current_user.id, format=format)
+    return StreamingResponse(
+        export_suggestions(db.bind, format, status),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="suggestions.{format}"'},
+    )
+
+
+@app.get("/me/suggestions", response_model=List[SuggestionSchema])
+async def get_my_suggestions(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    user_id: Optional[int] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Предложения текущего пользователя, от старых к новым
+
+    Модератор может передать user_id и получить список любого пользователя.
+    Страницы листаются курсором из заголовка X-Next-Cursor. Диапазон строк
+    находится по индексу (user_id, created_at, id), но индекс не покрывающий:
+    title, text и остальные колонки дочитываются из таблицы.
+    """
+    owner_id = current_user.id if user_id is None else user_id
+    try:
+        require_owner(current_user, owner_id)
+    except HTTPException:
+        log_security_event(
+            "UNAUTHORIZED_ACCESS", current_user.id, attempted_user_id=owner_id
+        )
+        raise
+
+    query = (
+        select(*suggestion_columns())
+        .where(SuggestionModel.user_id == owner_id)
+        .order_by(SuggestionModel.created_at, SuggestionModel.id)
+    )
+    if cursor:
+        query = query.where(after_cursor(decode_cursor(cursor)))
+
+    suggestions = (await db.execute(query.limit(limit))).all()
+    cursor_value = next_cursor(suggestions, limit)
+
+    return json_response(
+        rows_to_json(suggestions),
+        {"X-Next-Cursor": cursor_value} if cursor_value else None,
+    )
+
+
 @app.get("/suggestions/{suggestion_id}", response_model=SuggestionSchema)
-def get_suggestion(
+async def get_suggestion(
     suggestion_id: int,
-    current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получение конкретного предложения (owner-only)"""
     try:
-        suggestion = (
-            db.query(SuggestionModel)
-            .filter(SuggestionModel.id == suggestion_id)
-            .first()
-        )
+        suggestion = await db.get(SuggestionModel, suggestion_id)
 
         if not suggestion:
-            log_api_request(
-                "GET", f"/suggestions/{suggestion_id}", current_user.id, 404
-            )
             raise HTTPException(status_code=404, detail="Suggestion not found")
 
         # Проверка прав доступа
         require_owner(current_user, suggestion.user_id)
 
-        log_user_action(
-            "SUGGESTION_VIEW", current_user.id, f"suggestion_id={suggestion_id}"
-        )
-        log_api_request("GET", f"/suggestions/{suggestion_id}", current_user.id, 200)
+        log_user_action("SUGGESTION_VIEW", current_user.id, suggestion_id=suggestion_id)
 
-        return suggestion
+        return json_response(suggestion_to_json(suggestion))
 
     except HTTPException as e:
         if e.status_code == 403:
             log_security_event(
                 "UNAUTHORIZED_ACCESS",
                 current_user.id,
-                f"attempted_suggestion_id={suggestion_id}, "
-                f"owner_id={suggestion.user_id}",
+                attempted_suggestion_id=suggestion_id,
+                owner_id=suggestion.user_id,
             )
-        log_api_request(
-            "GET", f"/suggestions/{suggestion_id}", current_user.id, e.status_code
-        )
         raise
     except Exception as e:
         log_security_event(
             "GET_SUGGESTION_ERROR",
             current_user.id,
-            f"suggestion_id={suggestion_id}, error={str(e)}",
+            suggestion_id=suggestion_id,
+            error=e,
         )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -240,24 +505,17 @@ def get_suggestion(
 
 
 @app.put("/suggestions/{suggestion_id}", response_model=SuggestionSchema)
-def update_suggestion(
+async def update_suggestion(
     suggestion_id: int,
     suggestion_update: SuggestionUpdate,
-    current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Обновление предложения (owner-only)"""
     try:
-        suggestion = (
-            db.query(SuggestionModel)
-            .filter(SuggestionModel.id == suggestion_id)
-            .first()
-        )
+        suggestion = await db.get(SuggestionModel, suggestion_id)
 
         if not suggestion:
-            log_api_request(
-                "PUT", f"/suggestions/{suggestion_id}", current_user.id, 404
-            )
             raise HTTPException(status_code=404, detail="Suggestion not found")
 
         # Проверка прав доступа
@@ -268,33 +526,31 @@ def update_suggestion(
         for field, value in update_data.items():
             setattr(suggestion, field, value)
 
-        db.commit()
-        db.refresh(suggestion)
+        await db.commit()
+        await mark_user_write(current_user.id)
+        await bump_generation()
 
         log_user_action(
-            "SUGGESTION_UPDATE", current_user.id, f"suggestion_id={suggestion_id}"
+            "SUGGESTION_UPDATE", current_user.id, suggestion_id=suggestion_id
         )
-        log_api_request("PUT", f"/suggestions/{suggestion_id}", current_user.id, 200)
 
-        return suggestion
+        return json_response(suggestion_to_json(suggestion))
 
     except HTTPException as e:
         if e.status_code == 403:
             log_security_event(
                 "UNAUTHORIZED_UPDATE",
                 current_user.id,
-                f"attempted_suggestion_id={suggestion_id}, "
-                f"owner_id={suggestion.user_id}",
+                attempted_suggestion_id=suggestion_id,
+                owner_id=suggestion.user_id,
             )
-        log_api_request(
-            "PUT", f"/suggestions/{suggestion_id}", current_user.id, e.status_code
-        )
         raise
     except Exception as e:
         log_security_event(
             "UPDATE_SUGGESTION_ERROR",
             current_user.id,
-            f"suggestion_id={suggestion_id}, error={str(e)}",
+            suggestion_id=suggestion_id,
+            error=e,
         )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -303,35 +559,29 @@ def update_suggestion(
 
 
 @app.delete("/suggestions/{suggestion_id}")
-def delete_suggestion(
+async def delete_suggestion(
     suggestion_id: int,
-    current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Удаление предложения (owner-only)"""
     try:
-        suggestion = (
-            db.query(SuggestionModel)
-            .filter(SuggestionModel.id == suggestion_id)
-            .first()
-        )
+        suggestion = await db.get(SuggestionModel, suggestion_id)
 
         if not suggestion:
-            log_api_request(
-                "DELETE", f"/suggestions/{suggestion_id}", current_user.id, 404
-            )
             raise HTTPException(status_code=404, detail="Suggestion not found")
 
         # Проверка прав доступа
         require_owner(current_user, suggestion.user_id)
 
-        db.delete(suggestion)
-        db.commit()
+        await db.delete(suggestion)
+        await db.commit()
+        await mark_user_write(current_user.id)
+        await bump_generation()
 
         log_user_action(
-            "SUGGESTION_DELETE", current_user.id, f"suggestion_id={suggestion_id}"
+            "SUGGESTION_DELETE", current_user.id, suggestion_id=suggestion_id
         )
-        log_api_request("DELETE", f"/suggestions/{suggestion_id}", current_user.id, 200)
 
         return {"message": "Suggestion deleted successfully"}
 
@@ -340,18 +590,16 @@ def delete_suggestion(
             log_security_event(
                 "UNAUTHORIZED_DELETE",
                 current_user.id,
-                f"attempted_suggestion_id={suggestion_id}, "
-                f"owner_id={suggestion.user_id}",
+                attempted_suggestion_id=suggestion_id,
+                owner_id=suggestion.user_id,
             )
-        log_api_request(
-            "DELETE", f"/suggestions/{suggestion_id}", current_user.id, e.status_code
-        )
         raise
     except Exception as e:
         log_security_event(
             "DELETE_SUGGESTION_ERROR",
             current_user.id,
-            f"suggestion_id={suggestion_id}, error={str(e)}",
+            suggestion_id=suggestion_id,
+            error=e,
         )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -363,9 +611,8 @@ def delete_suggestion(
 
 
 @app.get("/debug/my-info")
-def get_my_info(current_user: UserModel = Depends(get_current_user)):
+async def get_my_info(current_user: CurrentUser = Depends(get_current_user)):
     """Информация о текущем пользователе"""
-    log_api_request("GET", "/debug/my-info", current_user.id, 200)
     return {
         "id": current_user.id,
         "email": current_user.email,
@@ -378,19 +625,22 @@ def get_my_info(current_user: UserModel = Depends(get_current_user)):
 
 
 @app.get("/health")
-def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_read_db)):
     """Проверка здоровья приложения и подключения к БД"""
     try:
-        db.execute(text("SELECT 1"))
-        log_api_request("GET", "/health", None, 200)
+        await db.execute(text("SELECT 1"))
         return {
             "status": "healthy",
             "database": "connected",
             "version": "0.1.0",
+            "password_hashing": get_hash_metrics(),
+            "user_cache": user_cache.stats(),
+            "token_cache": token_cache.stats(),
+            "response_cache": response_cache.stats(),
             "timestamp": datetime.utcnow().isoformat(),
         }
     except Exception as e:
-        log_security_event("HEALTH_CHECK_FAILED", None, f"database_error={str(e)}")
+        log_security_event("HEALTH_CHECK_FAILED", None, database_error=e)
         return {
             "status": "unhealthy",
             "database": "disconnected",
@@ -400,21 +650,36 @@ def health_check(db: Session = Depends(get_db)):
 
 
 @app.get("/logs/health")
-def logs_health():
+async def logs_health():
     """Проверка здоровья системы логирования"""
-    import os
-
-    log_files = (
-        [f for f in os.listdir("logs") if f.endswith(".log")]
-        if os.path.exists("logs")
-        else []
-    )
-
-    log_api_request("GET", "/logs/health", None, 200)
 
     return {
         "logging_status": "active",
-        "log_files": log_files,
-        "log_directory": "logs/",
+        "log_files": get_log_files(),
+        "log_directory": f"{LOG_DIR}/",
+        "queue": get_logging_stats(),
         "timestamp": datetime.utcnow().isoformat(),
     }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики в формате Prometheus"""
+    hashing = get_hash_metrics()
+    logging_stats = get_logging_stats()
+    gauges = {
+        "password_hash_calls_total": hashing["calls"],
+        "password_hash_rejected_total": hashing["rejected"],
+        "password_hash_queue_depth": hashing["queue_depth"],
+        "password_hash_queue_wait_seconds_total": hashing["queue_wait_seconds_total"],
+        "password_hash_seconds_total": hashing["hash_seconds_total"],
+        "user_cache_hits_total": user_cache.hits,
+        "user_cache_misses_total": user_cache.misses,
+        "token_cache_hits_total": token_cache.hits,
+        "token_cache_misses_total": token_cache.misses,
+        "response_cache_hits_total": response_cache.hits,
+        "response_cache_misses_total": response_cache.misses,
+        "log_queue_size": logging_stats["queue_size"],
+        "log_dropped_records_total": logging_stats["dropped_records"],
+    }
+    return render_prometheus(gauges)
@@ -0,0 +1,281 @@
+import os
+import time
+import warnings
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import STARTED_AT
+from app.logger import log_api_request, log_query_budget_exceeded, log_slow_query
+
+# Границы бакетов (секунды) задаются заранее: observe - это bisect и инкремент
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+DB_QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50)
+
+# SQL-запросы дольше SLOW_QUERY_MS пишутся в лог. Запрос, сделавший больше
+# QUERY_COUNT_LIMIT обращений к БД (признак N+1), логируется, а в тестовом
+# окружении (APP_ENV=test) еще и поднимает QueryBudgetWarning
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_COUNT_LIMIT = int(os.getenv("QUERY_COUNT_LIMIT", "10"))
+APP_ENV = os.getenv("APP_ENV", "production")
+
+
+class QueryBudgetWarning(UserWarning):
+    """HTTP-запрос выполнил больше SQL-запросов, чем QUERY_COUNT_LIMIT"""
+
+
+class Histogram:
+    """Гистограмма с фиксированными бакетами в формате Prometheus"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последний бакет - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """Счетчики одного запроса, которые наполняют хуки движка БД"""
+
+    __slots__ = ("db_time", "db_queries", "user_id")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.user_id: Optional[int] = None
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def set_request_user(user_id: int):
+    """Пользователь текущего запроса для строки API в логе"""
+    stats = request_stats.get()
+    if stats is not None:
+        stats.user_id = user_id
+
+
+class MetricsRegistry:
+    """Метрики HTTP-запросов воркера
+
+    Обновляется только из event loop (middleware асинхронный), поэтому
+    блокировки на горячем пути не нужны.
+    """
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.db_time: Dict[Tuple[str, str], Histogram] = {}
+        self.db_queries: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.in_flight = 0
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        stats: RequestStats,
+    ):
+        key = (method, route)
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.db_time[key] = Histogram(DB_TIME_BUCKETS)
+            self.db_queries[key] = Histogram(DB_QUERY_BUCKETS)
+        latency.observe(duration)
+        self.db_time[key].observe(stats.db_time)
+        self.db_queries[key].observe(stats.db_queries)
+        status_key = (method, route, status)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def reset(self):
+        self.__init__()
+
+
+registry = MetricsRegistry()
+
+
+class StartupTimer:
+    """Время запуска воркера: этапы lifespan, готовность и первый ответ
+
+    Отсчет - от импорта пакета app, так что в import попадает и загрузка
+    модулей приложения.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.steps: Dict[str, float] = {}
+        self.ready: Optional[float] = None
+        self.first_request: Optional[float] = None
+
+    def mark(self, name: str):
+        """Этап, идущий от старта до текущего момента"""
+        self.steps[name] = time.perf_counter() - self.started
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = time.perf_counter() - started
+
+    def mark_ready(self) -> float:
+        self.ready = time.perf_counter() - self.started
+        return self.ready
+
+    def mark_first_request(self):
+        if self.first_request is None:
+            self.first_request = time.perf_counter() - self.started
+
+
+startup = StartupTimer(STARTED_AT)
+
+
+def _route_template(scope) -> str:
+    # Шаблон пути ("/suggestions/{suggestion_id}"), а не сам путь:
+    # иначе каждое id давало бы новую серию метрик
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI middleware: латентность, коды ответов, in-flight и время в БД
+
+    Здесь же пишется строка API в лог: одна на запрос, с итоговым статусом
+    и длительностью.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            registry.in_flight -= 1
+            request_stats.reset(token)
+            route = _route_template(scope)
+            registry.observe(scope["method"], route, status_code, duration, stats)
+            log_api_request(
+                scope["method"],
+                scope["path"],
+                stats.user_id,
+                status_code,
+                duration * 1000,
+            )
+            if startup.first_request is None:
+                startup.mark_first_request()
+            if stats.db_queries > QUERY_COUNT_LIMIT:
+                _report_query_budget(scope["method"], route, stats.db_queries)
+
+
+def _report_query_budget(method: str, route: str, queries: int):
+    log_query_budget_exceeded(method, route, queries, QUERY_COUNT_LIMIT)
+    if APP_ENV == "test":
+        warnings.warn(
+            f"{method} {route} executed {queries} SQL queries "
+            f"(limit {QUERY_COUNT_LIMIT})",
+            QueryBudgetWarning,
+            stacklevel=2,
+        )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Запросы на одном соединении идут последовательно, стек не нужен
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"]
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        log_slow_query(statement, elapsed * 1000)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_time += elapsed
+        stats.db_queries += 1
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _render_histogram(lines: list, name: str, series: Dict[Tuple[str, str], Histogram]):
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in series.items():
+        base = _labels(method=method, route=route)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{base},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{base}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{base}}} {histogram.count}")
+
+
+def render_prometheus(gauges: Optional[Dict[str, float]] = None) -> str:
+    """Текстовый формат экспозиции Prometheus (gauges - внешние счетчики)"""
+    lines = []
+    _render_histogram(lines, "http_request_duration_seconds", registry.latency)
+    _render_histogram(lines, "http_request_db_duration_seconds", registry.db_time)
+    _render_histogram(lines, "http_request_db_queries", registry.db_queries)
+
+    lines.append("# TYPE http_requests_total counter")
+    for (method, route, status), count in registry.responses.items():
+        labels = _labels(method=method, route=route, status=status)
+        lines.append(f"http_requests_total{{{labels}}} {count}")
+
+    lines.append("# TYPE http_requests_in_flight gauge")
+    lines.append(f"http_requests_in_flight {registry.in_flight}")
+
+    if startup.steps:
+        lines.append("# TYPE app_startup_step_seconds gauge")
+        for name, seconds in startup.steps.items():
+            lines.append(f'app_startup_step_seconds{{step="{name}"}} {seconds}')
+    for name, seconds in (
+        ("app_startup_ready_seconds", startup.ready),
+        ("app_time_to_first_request_seconds", startup.first_request),
+    ):
+        if seconds is not None:
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {seconds}")
+
+    for name, value in (gauges or {}).items():
+        metric_type = "counter" if name.endswith("_total") else "gauge"
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,74 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(PROJECT_ROOT, "alembic.ini")
+
+# При старте приложение само доводит схему до последней ревизии. Если
+# миграции применяются отдельно (alembic upgrade head до запуска воркеров),
+# DB_MIGRATE_ON_STARTUP=false оставляет только проверку ревизии
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Ревизия, совпадающая со схемой create_all до появления миграций
+BASELINE_REVISION = "0001"
+
+# Поисковый индекс (FTS5-таблицы SQLite и GIN-индекс PostgreSQL) создается
+# миграцией вручную и в моделях не описан - autogenerate его не трогает
+SEARCH_OBJECTS_PREFIX = "suggestions_fts"
+SEARCH_INDEXES = {"ix_suggestions_search"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Фильтр объектов схемы для autogenerate"""
+    if type_ == "table" and name.startswith(SEARCH_OBJECTS_PREFIX):
+        return False
+    if type_ == "index" and name in SEARCH_INDEXES:
+        return False
+    return True
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    config.attributes["connection"] = connection
+    return config
+
+
+def run_migrations(engine, revision: str = "head"):
+    """Доводит схему БД до нужной ревизии
+
+    БД, созданная через create_all (таблицы есть, alembic_version нет),
+    сначала помечается базовой ревизией, чтобы миграции не пытались заново
+    создать существующие таблицы.
+    """
+    with engine.begin() as connection:
+        tables = set(inspect(connection).get_table_names())
+        config = alembic_config(connection)
+        if "alembic_version" not in tables and "suggestions" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
+
+def check_schema(engine) -> str:
+    """Текущая ревизия БД; RuntimeError, если она не последняя"""
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {head}. "
+            "Run `alembic upgrade head`."
+        )
+    return current
+
+
+def prepare_schema(engine):
+    """Миграции или проверка схемы при старте (см. DB_MIGRATE_ON_STARTUP)"""
+    if DB_MIGRATE_ON_STARTUP:
+        run_migrations(engine)
+    check_schema(engine)
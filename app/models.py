@@ -2,6 +2,7 @@ from datetime import datetime
 
 from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import Index
 
 from app.database import Base
 
@@ -31,5 +32,27 @@ class Suggestion(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Связь с пользователем
-    user = relationship("User", back_populates="suggestions")
+    # Связь с пользователем. Неявная ленивая загрузка запрещена: она давала бы
+    # лишний SELECT (N+1) на каждое предложение в списке
+    user = relationship("User", back_populates="suggestions", lazy="raise_on_sql")
+
+    # Индексы под keyset-пагинацию списка по (created_at, id), в том числе
+    # с фильтром по статусу и по автору. Меняются только миграциями (migrations/)
+    __table_args__ = (
+        Index("ix_suggestions_created_at_id", "created_at", "id"),
+        Index("ix_suggestions_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_suggestions_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+
+class SuggestionStat(Base):
+    """Число предложений в каждом статусе
+
+    Обновляется в той же транзакции, что и сами предложения (app/stats.py),
+    и периодически сверяется с таблицей suggestions.
+    """
+
+    __tablename__ = "suggestion_stats"
+
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,52 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+from app.models import Suggestion
+
+# id в курсоре подставляется в запрос; за пределами BIGINT драйвер не
+# смог бы его передать
+MAX_CURSOR_ID = 2**63 - 1
+
+
+def encode_cursor(created_at: datetime, suggestion_id: int) -> str:
+    """Кодирует позицию (created_at, id) в непрозрачный курсор"""
+    raw = json.dumps([created_at.isoformat(), suggestion_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Декодирует курсор обратно в позицию (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, suggestion_id = json.loads(base64.urlsafe_b64decode(padded))
+        position = datetime.fromisoformat(created_at), int(suggestion_id)
+    except (binascii.Error, ValueError, TypeError, OverflowError):
+        position = None
+    if position is None or not 1 <= position[1] <= MAX_CURSOR_ID:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return position
+
+
+def after_cursor(position: Tuple[datetime, int]):
+    """Условие keyset-пагинации: строки строго после позиции курсора"""
+    created_at, suggestion_id = position
+    return or_(
+        Suggestion.created_at > created_at,
+        and_(Suggestion.created_at == created_at, Suggestion.id > suggestion_id),
+    )
+
+
+def next_cursor(suggestions: List[Suggestion], limit: int) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница последняя"""
+    if not suggestions or len(suggestions) < limit:
+        return None
+    last = suggestions[-1]
+    return encode_cursor(last.created_at, last.id)
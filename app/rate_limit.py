@@ -0,0 +1,346 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+
+import orjson
+
+from app.cache import CACHE_BACKEND, CACHE_URL, RedisCache
+from app.logger import log_security_event
+
+# SEC-NFR-005: не больше RATE_LIMIT_PER_SECOND запросов в секунду с IP к /auth/*
+# (всплеск до RATE_LIMIT_BURST), и блокировка /auth/* для IP, у которого
+# LOGIN_FAILURE_LIMIT неудачных входов за LOGIN_FAILURE_WINDOW_SECONDS
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+# Пишущие методы вне /auth/ - тот же лимит SEC-NFR-005, но свой счетчик:
+# запись не расходует лимит входа. Поднимается (для нагрузочных прогонов,
+# адресов за NAT) отдельно от /auth/*, 0 - запись не ограничивается
+RATE_LIMIT_WRITE_PER_SECOND = float(os.getenv("RATE_LIMIT_WRITE_PER_SECOND", "10"))
+RATE_LIMIT_WRITE_BURST = int(os.getenv("RATE_LIMIT_WRITE_BURST", "10"))
+LOGIN_FAILURE_LIMIT = int(os.getenv("LOGIN_FAILURE_LIMIT", "100"))
+LOGIN_FAILURE_WINDOW_SECONDS = float(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "3600"))
+
+# memory - счетчики в памяти воркера; redis - общие для всех воркеров
+# (по CACHE_URL). Память ограничена RATE_LIMIT_MAX_CLIENTS адресами на
+# счетчик, давно не приходившие адреса вытесняются первыми
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", CACHE_BACKEND)
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "64"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+AUTH_PREFIX = "/auth/"
+LOGIN_PATH = "/auth/login"
+
+
+def sliding_retry_after(
+    current: int, previous: int, fraction: float, window: float, limit: int
+) -> float:
+    """Сколько секунд ждать, пока оценка скользящего окна не станет меньше limit
+
+    Оценка - previous * (1 - fraction) + current, где fraction - прошедшая
+    доля текущего окна. 0 - лимит не достигнут.
+    """
+    if previous * (1 - fraction) + current < limit:
+        return 0.0
+    if current >= limit:
+        # Текущее окно само по себе превышает лимит: ждем, пока оно станет
+        # предыдущим и его вес упадет
+        return window * (1 - fraction) + window * (1 - limit / current)
+    return window * (1 - (limit - current) / previous - fraction)
+
+
+class _Shards:
+    """LRU-словари ключ -> состояние, каждый под своей блокировкой"""
+
+    def __init__(self, shards: int, max_keys: int):
+        self.max_per_shard = max(1, max_keys // shards)
+        self.shards: List[Tuple[threading.Lock, OrderedDict]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(shards)
+        ]
+
+    def get(self, key: str) -> Tuple[threading.Lock, OrderedDict]:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def clear(self):
+        for lock, entries in self.shards:
+            with lock:
+                entries.clear()
+
+
+def _touch(entries: OrderedDict, key: str, max_keys: int, factory):
+    """Запись key (новая - из factory) с пометкой недавнего использования"""
+    entry = entries.get(key)
+    if entry is None:
+        entry = entries[key] = factory()
+        if len(entries) > max_keys:
+            entries.popitem(last=False)
+    else:
+        entries.move_to_end(key)
+    return entry
+
+
+def _roll(entry: list, index: int):
+    """Сдвигает счетчики [окно, текущее, предыдущее] к окну index"""
+    if entry[0] != index:
+        entry[2] = entry[1] if entry[0] == index - 1 else 0
+        entry[1] = 0
+        entry[0] = index
+
+
+class MemoryRateStore:
+    """Счетчики в памяти воркера
+
+    Запросы - token bucket, неудачные входы - скользящее окно из двух
+    счетчиков. Оба O(1) по времени и памяти на адрес.
+    """
+
+    def __init__(
+        self,
+        shards: int = RATE_LIMIT_SHARDS,
+        max_clients: int = RATE_LIMIT_MAX_CLIENTS,
+    ):
+        self._buckets = _Shards(shards, max_clients)
+        self._failures = _Shards(shards, max_clients)
+
+    async def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Забирает токен; 0 - запрос разрешен, иначе секунды до нового токена"""
+        lock, buckets = self._buckets.get(key)
+        with lock:
+            bucket = _touch(
+                buckets, key, self._buckets.max_per_shard, lambda: [burst, now]
+            )
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    async def failures(self, key: str, index: int) -> Tuple[int, int]:
+        """(текущее, предыдущее) число неудачных входов для окна index"""
+        lock, entries = self._failures.get(key)
+        with lock:
+            entry = entries.get(key)
+            if entry is None:
+                return 0, 0
+            _roll(entry, index)
+            return entry[1], entry[2]
+
+    async def add_failure(self, key: str, index: int, window: float) -> Tuple[int, int]:
+        lock, entries = self._failures.get(key)
+        with lock:
+            entry = _touch(
+                entries, key, self._failures.max_per_shard, lambda: [index, 0, 0]
+            )
+            _roll(entry, index)
+            entry[1] += 1
+            return entry[1], entry[2]
+
+    async def clear(self):
+        self._buckets.clear()
+        self._failures.clear()
+
+
+class SharedRateStore:
+    """Счетчики в Redis, общие для всех воркеров
+
+    Атомарного token bucket без скриптов в Redis нет, поэтому запросы тоже
+    считаются скользящим окном: burst запросов за burst / rate секунд.
+    Каждая проверка - один обмен с сервером. Пока Redis недоступен, запросы
+    пропускаются: лимит не должен класть сервис.
+    """
+
+    def __init__(self, cache: RedisCache):
+        self.cache = cache
+
+    async def _counts(self, name: str, index: int, increment: bool, ttl: float):
+        current = self.cache.key(f"{name}:{index}")
+        previous = self.cache.key(f"{name}:{index - 1}")
+
+        def build(pipe):
+            if increment:
+                pipe.incr(current).pexpire(current, max(1, int(ttl * 1000)))
+            else:
+                pipe.get(current)
+            pipe.get(previous)
+
+        replies = await self.cache.pipeline(build)
+        if not replies:
+            return 0, 0
+        return int(replies[0] or 0), int(replies[-1] or 0)
+
+    async def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        window = burst / rate
+        index, elapsed = divmod(now, window)
+        current, previous = await self._counts(
+            f"requests:{key}", int(index), increment=True, ttl=2 * window
+        )
+        if not current:
+            return 0.0
+        # current уже включает этот запрос
+        return sliding_retry_after(
+            current - 1, previous, elapsed / window, window, burst
+        )
+
+    async def failures(self, key: str, index: int) -> Tuple[int, int]:
+        return await self._counts(f"failures:{key}", index, increment=False, ttl=0)
+
+    async def add_failure(self, key: str, index: int, window: float) -> Tuple[int, int]:
+        return await self._counts(
+            f"failures:{key}", index, increment=True, ttl=2 * window
+        )
+
+    async def clear(self):
+        await self.cache.clear()
+
+
+class RateLimiter:
+    """Лимиты запросов и неудачных входов по IP"""
+
+    def __init__(
+        self,
+        store,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        failure_limit: int = LOGIN_FAILURE_LIMIT,
+        failure_window: float = LOGIN_FAILURE_WINDOW_SECONDS,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        clock: Callable[[], float] = time.time,
+        write_rate: float = RATE_LIMIT_WRITE_PER_SECOND,
+        write_burst: int = RATE_LIMIT_WRITE_BURST,
+    ):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.write_rate = write_rate
+        self.write_burst = write_burst
+        self.failure_limit = failure_limit
+        self.failure_window = failure_window
+        self.enabled = enabled
+        self.clock = clock
+
+    async def check_request(self, client: str) -> float:
+        """Запрос к /auth/*: 0 - разрешен, иначе секунды до следующей попытки"""
+        return await self.store.take(client, self.rate, self.burst, self.clock())
+
+    async def check_write(self, client: str) -> float:
+        """Пишущий запрос вне /auth/*, свой счетчик с лимитом записи"""
+        if not self.write_rate:
+            return 0.0
+        return await self.store.take(
+            f"write:{client}", self.write_rate, self.write_burst, self.clock()
+        )
+
+    def _window(self) -> Tuple[int, float]:
+        index, elapsed = divmod(self.clock(), self.failure_window)
+        return int(index), elapsed / self.failure_window
+
+    async def check_login(self, client: str) -> float:
+        """0 - входить можно, иначе секунды до конца блокировки"""
+        index, fraction = self._window()
+        current, previous = await self.store.failures(client, index)
+        return sliding_retry_after(
+            current, previous, fraction, self.failure_window, self.failure_limit
+        )
+
+    async def record_login_failure(self, client: str) -> bool:
+        """Учитывает неудачный вход; True - этим входом адрес заблокирован"""
+        index, fraction = self._window()
+        current, previous = await self.store.add_failure(
+            client, index, self.failure_window
+        )
+        estimate = previous * (1 - fraction) + current
+        return estimate >= self.failure_limit > estimate - 1
+
+    async def clear(self):
+        await self.store.clear()
+
+
+def create_rate_limiter() -> RateLimiter:
+    if RATE_LIMIT_BACKEND == "redis":
+        return RateLimiter(SharedRateStore(RedisCache(CACHE_URL, "rate_limit", ttl=1)))
+    return RateLimiter(MemoryRateStore())
+
+
+rate_limiter = create_rate_limiter()
+
+
+def _client_ip(scope) -> str:
+    # За обратным прокси адрес клиента подставляет uvicorn --proxy-headers
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _reject(send, retry_after: float, detail: str):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": orjson.dumps({"detail": detail})})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware: 429 с Retry-After при превышении лимитов
+
+    Ограничиваются /auth/* и, с отдельным лимитом, пишущие методы; чтение
+    не ограничивается.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter
+        if scope["type"] != "http" or not limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        is_auth = path.startswith(AUTH_PREFIX)
+        if not is_auth and scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        client = _client_ip(scope)
+        if is_auth:
+            retry_after = await limiter.check_login(client)
+            if retry_after:
+                await _reject(send, retry_after, "Too many failed login attempts")
+                return
+            retry_after = await limiter.check_request(client)
+        else:
+            retry_after = await limiter.check_write(client)
+        if retry_after:
+            await _reject(send, retry_after, "Too many requests")
+            return
+
+        if path != LOGIN_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        if status_code == 401 and await limiter.record_login_failure(client):
+            log_security_event(
+                "LOGIN_BRUTE_FORCE_BLOCKED",
+                ip=client,
+                failure_limit=limiter.failure_limit,
+            )
@@ -0,0 +1,56 @@
+import hashlib
+import os
+from typing import Hashable, Optional
+
+from app.cache import SingleFlight, create_cache
+
+# Кэш готовых JSON-ответов списка предложений. Ключ включает номер поколения:
+# любая запись в suggestions увеличивает поколение, и старые ответы больше
+# не находятся (а потом вытесняются LRU или истекают). Поколение - счетчик
+# в том же кэше, поэтому при CACHE_BACKEND=redis запись в одном воркере
+# инвалидирует ответы во всех. ETag - хэш самого ответа, а не поколения:
+# счетчик у каждого воркера свой и обнуляется при перезапуске, а одинаковый
+# ETag у разных ответов дал бы клиенту ложный 304
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+# Страница под конкретным поколением не меняется, ее можно держать локально
+response_cache = create_cache(
+    "responses", RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS, near_cache=True
+)
+response_loads = SingleFlight()
+
+
+async def current_generation() -> int:
+    return await response_cache.get_counter("generation")
+
+
+async def bump_generation():
+    """Инвалидирует все закэшированные списки (вызывается после записи)"""
+    await response_cache.incr("generation")
+
+
+def _digest(key: Hashable) -> str:
+    return hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+
+
+def page_key(generation: int, key: Hashable) -> str:
+    """Ключ закэшированной страницы"""
+    return f"{generation}:{_digest(key)}"
+
+
+def make_etag(body: bytes, cursor: str = "") -> str:
+    """ETag страницы: хэш тела и курсора следующей страницы"""
+    digest = hashlib.blake2b(body, digest_size=16)
+    digest.update(b"\0" + cursor.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Сравнение по If-None-Match (RFC 9110, слабое сравнение)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == etag for tag in candidates
+    )
@@ -0,0 +1,66 @@
+from typing import Any, Mapping, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import HTTPException, Response, status
+
+from app.models import Suggestion as SuggestionModel
+from app.schemas import Suggestion as SuggestionSchema
+
+# Поля предложения в порядке схемы Suggestion: так ответ из строк совпадает
+# с ответом через pydantic байт в байт
+SUGGESTION_FIELDS = tuple(SuggestionSchema.model_fields)
+
+# pydantic пишет UTC-время с суффиксом Z, orjson по умолчанию - +00:00
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Разбирает fields=id,title в кортеж полей в порядке схемы
+
+    None - нужны все поля. Порядок в запросе не важен: одинаковые наборы
+    дают одинаковый ключ кэша.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(SUGGESTION_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Unknown fields: {', '.join(sorted(unknown))}"
+                if unknown
+                else "Empty fields"
+            ),
+        )
+    return tuple(name for name in SUGGESTION_FIELDS if name in requested)
+
+
+def suggestion_columns(names: Sequence[str] = SUGGESTION_FIELDS) -> list:
+    """Колонки модели для select(*...): строки вместо ORM-объектов"""
+    return [getattr(SuggestionModel, name) for name in names]
+
+
+def rows_to_json(rows: Sequence, names: Sequence[str] = SUGGESTION_FIELDS) -> bytes:
+    """JSON-массив объектов только с полями names прямо из строк выборки
+
+    Подходят и строки select(*колонки), и ORM-объекты: значения из БД уже
+    нужных типов, поэтому повторная проверка через pydantic не нужна.
+    """
+    return orjson.dumps(
+        [{name: getattr(row, name) for name in names} for row in rows],
+        option=ORJSON_OPTIONS,
+    )
+
+
+def suggestion_to_json(suggestion: Any) -> bytes:
+    """JSON одного предложения в формате схемы Suggestion"""
+    return orjson.dumps(
+        {name: getattr(suggestion, name) for name in SUGGESTION_FIELDS},
+        option=ORJSON_OPTIONS,
+    )
+
+
+def json_response(body: bytes, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Готовое JSON-тело: FastAPI не проверяет его по response_model"""
+    return Response(content=body, media_type="application/json", headers=headers)
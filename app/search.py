@@ -0,0 +1,199 @@
+import os
+import re
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import DDL, event, func, literal_column, or_, select
+from sqlalchemy.sql import column, table
+
+from app.models import Suggestion
+
+# Полнотекстовый поиск по title и text.
+# SQLite: FTS5-таблица suggestions_fts с внешним содержимым (сами строки
+# хранятся только в suggestions), синхронизируется триггерами.
+# PostgreSQL: GIN-индекс по tsvector-выражению, обновляется самой СУБД.
+# SEARCH_CONFIG - конфигурация текстового поиска PostgreSQL; simple не
+# зависит от языка, поэтому подходит для смеси русского и английского.
+# Миграция 0002 строит индекс с simple: другое значение требует новой
+# миграции, пересоздающей ix_suggestions_search
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "simple")
+SEARCH_MAX_TERMS = int(os.getenv("SEARCH_MAX_TERMS", "8"))
+# bm25 и ts_rank считаются для каждого совпадения до LIMIT, и частое слово
+# на сотнях тысяч строк стоит сотни миллисекунд. Поэтому ранжируются только
+# SEARCH_MAX_CANDIDATES самых новых совпадений. Цена - релевантность: более
+# старые совпадения (даже в заголовке) в выдачу не попадают, а страницы
+# дальше skip + limit > SEARCH_MAX_CANDIDATES отклоняются с 400.
+# 0 - ранжировать все совпадения
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+
+if not re.fullmatch(r"[a-z_]+", SEARCH_CONFIG):
+    raise ValueError("SEARCH_CONFIG must be a text search configuration name")
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS suggestions_fts USING fts5("
+    "title, text, content='suggestions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS suggestions_fts_ai AFTER INSERT ON suggestions "
+    "BEGIN "
+    "INSERT INTO suggestions_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS suggestions_fts_ad AFTER DELETE ON suggestions "
+    "BEGIN "
+    "INSERT INTO suggestions_fts(suggestions_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS suggestions_fts_au "
+    "AFTER UPDATE OF title, text ON suggestions "
+    "BEGIN "
+    "INSERT INTO suggestions_fts(suggestions_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO suggestions_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); "
+    "END",
+    # Индекс строится по уже существующим строкам
+    "INSERT INTO suggestions_fts(suggestions_fts) VALUES ('rebuild')",
+]
+
+# Выражение индекса и запроса должно совпадать буквально, иначе
+# планировщик PostgreSQL не использует индекс
+POSTGRES_DOCUMENT = " || ".join(
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(suggestions.{name}, '')), "
+    f"'{weight}')"
+    for name, weight in (("title", "A"), ("text", "B"))
+)
+POSTGRES_SEARCH_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_suggestions_search ON suggestions "
+    f"USING GIN (({POSTGRES_DOCUMENT}))",
+]
+
+# Рабочая БД получает поисковый индекс миграцией 0002 (там копия этого DDL,
+# совпадение проверяют тесты миграций).
+# Здесь то же самое для схемы из create_all (тесты): новая таблица
+# suggestions сразу получает индекс, а удаление таблицы удаляет и
+# FTS-таблицу, чтобы не оставить чужих rowid
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Suggestion.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+event.listen(
+    Suggestion.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS suggestions_fts").execute_if(dialect="sqlite"),
+)
+for _statement in POSTGRES_SEARCH_DDL:
+    event.listen(
+        Suggestion.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
+
+
+def check_search_window(skip: int, limit: int):
+    """Страница должна лежать внутри ранжируемых кандидатов"""
+    if SEARCH_MAX_CANDIDATES and skip + limit > SEARCH_MAX_CANDIDATES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search results are limited to the first "
+            f"{SEARCH_MAX_CANDIDATES} matches",
+        )
+
+
+def search_terms(q: str) -> List[str]:
+    """Слова запроса; операторы FTS из пользовательского ввода не проходят"""
+    terms = re.findall(r"\w+", q)[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Empty search query")
+    return terms
+
+
+_fts = table("suggestions_fts", column("rowid"))
+
+
+def _newest_candidates(id_column, condition, max_candidates: int):
+    """Условие id >= id N-го с конца совпадения: не больше N строк на ранжирование
+
+    Подзапрос идет по совпадениям в порядке убывания id и останавливается
+    на N-м, без подсчета релевантности. Совпадений меньше N - порог 0.
+    """
+    threshold = (
+        select(id_column)
+        .where(condition)
+        .order_by(id_column.desc())
+        .offset(max_candidates - 1)
+        .limit(1)
+        .correlate(None)
+        .scalar_subquery()
+    )
+    return id_column >= func.coalesce(threshold, 0)
+
+
+def search_query(
+    dialect: str,
+    q: str,
+    columns: Sequence = (Suggestion,),
+    max_candidates: Optional[int] = None,
+):
+    """SELECT предложений, подходящих под все слова q, от лучшего к худшему
+
+    columns - что выбирать: модель целиком или отдельные колонки.
+    max_candidates - сколько самых новых совпадений ранжировать (0 - все,
+    по умолчанию SEARCH_MAX_CANDIDATES).
+    """
+    terms = search_terms(q)
+    if max_candidates is None:
+        max_candidates = SEARCH_MAX_CANDIDATES
+
+    if dialect == "sqlite":
+        # Каждое слово в кавычках - отдельная фраза, все фразы через AND
+        match = " ".join(f'"{term}"' for term in terms)
+        fts_name = literal_column("suggestions_fts")
+        condition = fts_name.op("MATCH")(match)
+        query = (
+            select(*columns)
+            .join(_fts, _fts.c.rowid == Suggestion.id)
+            .where(condition)
+            # Совпадение в заголовке весит больше, чем в тексте
+            .order_by(func.bm25(fts_name, 10.0, 1.0), Suggestion.id)
+        )
+        if max_candidates:
+            # Ограничение по rowid FTS5 применяет сам, не читая лишние строки
+            query = query.where(
+                _newest_candidates(_fts.c.rowid, condition, max_candidates)
+            )
+        return query
+
+    if dialect == "postgresql":
+        document = literal_column(f"({POSTGRES_DOCUMENT})")
+        ts_query = func.plainto_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'"), " ".join(terms)
+        )
+        condition = document.op("@@")(ts_query)
+        query = (
+            select(*columns)
+            .where(condition)
+            .order_by(func.ts_rank(document, ts_query).desc(), Suggestion.id)
+        )
+        if max_candidates:
+            query = query.where(
+                _newest_candidates(Suggestion.id, condition, max_candidates)
+            )
+        return query
+
+    # Прочие СУБД: без индекса, полным просмотром
+    patterns = [f"%{term.replace('_', '!_')}%" for term in terms]
+    return (
+        select(*columns)
+        .where(
+            *(
+                or_(
+                    Suggestion.title.ilike(pattern, escape="!"),
+                    Suggestion.text.ilike(pattern, escape="!"),
+                )
+                for pattern in patterns
+            )
+        )
+        .order_by(Suggestion.id)
+    )
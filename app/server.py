@@ -0,0 +1,151 @@
+"""Конфигурация gunicorn для продакшена: несколько воркеров uvicorn
+
+    gunicorn -c python:app.server app.main:app
+
+Приложение импортируется один раз в мастере (preload_app) и наследуется
+воркерами через fork. Миграции выполняются в мастере до запуска воркеров,
+воркеры только проверяют ревизию схемы. По SIGTERM воркеры перестают
+принимать соединения, дорабатывают начатые запросы и дописывают логи.
+
+Кэши, лимиты запросов и метка read-your-writes должны быть общими для всех
+воркеров, поэтому больше одного воркера - только с CACHE_BACKEND=redis.
+"""
+
+import math
+import os
+from itertools import count
+
+from uvicorn_worker import UvicornWorker as _UvicornWorker
+
+from app import logger, migrate
+from app.cache import CACHE_BACKEND
+from app.rate_limit import RATE_LIMIT_BACKEND
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+
+# Воркер перезапускается после MAX_REQUESTS (+ случайно до
+# MAX_REQUESTS_JITTER, чтобы не все сразу) запросов: так ограничивается
+# рост памяти. 0 - без перезапусков
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# Сколько ждать начатые запросы после SIGTERM; последние
+# SHUTDOWN_MARGIN_SECONDS из них оставлены на lifespan (сброс логов,
+# остановка пула хэширования), иначе мастер убьет воркер раньше
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+SHUTDOWN_MARGIN_SECONDS = int(os.getenv("SHUTDOWN_MARGIN_SECONDS", "5"))
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "60"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+PRELOAD_APP = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+
+def available_cpus() -> int:
+    """Ядра, доступные процессу: affinity и квота CPU контейнера (cgroup v2)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # нет в macOS
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def shared_state() -> bool:
+    """Кэши и лимиты запросов общие для процессов (Redis), а не в памяти"""
+    return CACHE_BACKEND == "redis" and RATE_LIMIT_BACKEND == "redis"
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY, если задан, иначе по воркеру на доступное ядро
+
+    Воркер асинхронный и сам загружает ядро; Argon2 считается в его пуле
+    процессов (HASH_POOL_SIZE), поэтому 2 * ядра + 1 здесь не нужно.
+    С кэшами в памяти воркер один: у нескольких были бы свои кэши, и запись
+    через один воркер не сбрасывала бы кэш пользователей и списков у других.
+    """
+    configured = os.getenv("WEB_CONCURRENCY")
+    workers = max(1, int(configured)) if configured else available_cpus()
+    if shared_state():
+        return workers
+    if configured and workers > 1:
+        raise ValueError(
+            f"WEB_CONCURRENCY={workers} needs CACHE_BACKEND=redis: "
+            "in-memory caches are not shared between workers"
+        )
+    return 1
+
+
+class UvicornWorker(_UvicornWorker):
+    """Воркер uvicorn, который укладывает остановку в graceful_timeout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(
+            1, self.cfg.graceful_timeout - SHUTDOWN_MARGIN_SECONDS
+        )
+
+
+# Настройки gunicorn
+bind = f"{HOST}:{PORT}"
+workers = worker_count()
+worker_class = "app.server.UvicornWorker"
+preload_app = PRELOAD_APP
+graceful_timeout = GRACEFUL_TIMEOUT
+timeout = WORKER_TIMEOUT
+keepalive = KEEPALIVE
+max_requests = MAX_REQUESTS
+max_requests_jitter = MAX_REQUESTS_JITTER
+# Запросы уже пишет в лог само приложение
+accesslog = None
+
+
+# Хуки gunicorn
+def on_starting(server):
+    """Мастер, до запуска воркеров: миграции выполняются один раз"""
+    from app.database import engine
+
+    if migrate.DB_MIGRATE_ON_STARTUP:
+        migrate.run_migrations(engine)
+        # Воркеры наследуют флаг и при старте только проверяют ревизию
+        migrate.DB_MIGRATE_ON_STARTUP = False
+    engine.dispose()
+
+
+def pre_fork(server, worker):
+    """Номер слота воркера: наименьший свободный среди живых
+
+    Перезапущенный воркер получает слот предшественника и продолжает его
+    файл лога, а не заводит новый.
+    """
+    taken = {getattr(other, "slot", None) for other in server.WORKERS.values()}
+    worker.slot = next(slot for slot in count() if slot not in taken)
+
+
+def post_fork(server, worker):
+    """Воркер, сразу после fork: свои соединения с БД и свой файл лога"""
+    from app.database import async_engine, engine, read_engine
+
+    # Соединения, открытые мастером, принадлежат ему: close=False не трогает
+    # их сокеты, пул воркера просто начинается пустым
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if read_engine is not async_engine:
+        read_engine.sync_engine.dispose(close=False)
+
+    # Каждый процесс ротирует и сжимает свой файл, иначе воркеры
+    # переименовывали бы файл друг у друга
+    logger.LOG_FILE_NAME = f"{logger.LOG_FILE_NAME}-{worker.slot}"
+
+
+def worker_exit(server, worker):
+    """Воркер завершается: дописываем очередь логов, даже если lifespan не успел"""
+    from app.auth import shutdown_hash_pool
+
+    logger.stop_logging()
+    shutdown_hash_pool()
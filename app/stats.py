@@ -0,0 +1,123 @@
+import asyncio
+import os
+from typing import Dict, List
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.logger import log_stats_drift
+from app.models import Suggestion, SuggestionStat
+
+# Счетчики suggestion_stats меняются вместе с предложениями, поэтому расходятся
+# только при записи в обход приложения. Сверка с таблицей раз в
+# STATS_RECONCILE_SECONDS (0 - отключена)
+STATS_RECONCILE_SECONDS = float(os.getenv("STATS_RECONCILE_SECONDS", "300"))
+
+KNOWN_STATUSES = ("pending", "approved", "rejected", "in_progress")
+
+
+def status_delta_statements(dialect: str, deltas: Dict[str, int]) -> List:
+    """UPSERT-запросы, прибавляющие deltas к счетчикам статусов
+
+    INSERT ... ON CONFLICT DO UPDATE есть и в SQLite, и в PostgreSQL.
+    """
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statements = []
+    for status, delta in deltas.items():
+        if not status or not delta:
+            continue
+        stmt = dialect_insert(SuggestionStat).values(status=status, count=delta)
+        statements.append(
+            stmt.on_conflict_do_update(
+                index_elements=[SuggestionStat.status],
+                set_={"count": SuggestionStat.count + stmt.excluded.count},
+            )
+        )
+    return statements
+
+
+def _apply(connection, deltas: Dict[str, int]):
+    for statement in status_delta_statements(connection.dialect.name, deltas):
+        connection.execute(statement)
+
+
+# Изменения через ORM (создание, правка, удаление одного предложения)
+# попадают в счетчики в той же транзакции, при flush
+@event.listens_for(Suggestion, "after_insert")
+def _count_inserted(mapper, connection, target):
+    _apply(connection, {target.status: 1})
+
+
+@event.listens_for(Suggestion, "after_update")
+def _count_updated(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if history.has_changes():
+        old = history.deleted[0] if history.deleted else None
+        if old != target.status:
+            _apply(connection, {old: -1, target.status: 1})
+
+
+@event.listens_for(Suggestion, "after_delete")
+def _count_deleted(mapper, connection, target):
+    _apply(connection, {target.status: -1})
+
+
+async def add_status_counts(db: AsyncSession, deltas: Dict[str, int]):
+    """Для массовых INSERT, которые не вызывают события ORM"""
+    for statement in status_delta_statements(db.bind.dialect.name, deltas):
+        await db.execute(statement)
+
+
+async def get_status_counts(db: AsyncSession) -> Dict[str, int]:
+    counts = dict.fromkeys(KNOWN_STATUSES, 0)
+    rows = await db.execute(select(SuggestionStat.status, SuggestionStat.count))
+    counts.update({status: count for status, count in rows if count})
+    return counts
+
+
+def reconcile_status_counts(connection) -> Dict[str, int]:
+    """Пересчитывает счетчики по suggestions; возвращает исправленные расхождения
+
+    Вызывается внутри транзакции. Старые счетчики удаляются первым запросом,
+    а новые считаются INSERT ... SELECT уже под блокировкой записи: в SQLite
+    ее берет сам DELETE (драйвер не открывает транзакцию до первой записи),
+    в PostgreSQL таблица счетчиков блокируется явно. Иначе изменение,
+    закоммиченное между подсчетом и заменой, потерялось бы.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("LOCK TABLE suggestion_stats IN EXCLUSIVE MODE"))
+    removed = delete(SuggestionStat).returning(
+        SuggestionStat.status, SuggestionStat.count
+    )
+    stored = dict(connection.execute(removed).all())
+    connection.execute(
+        insert(SuggestionStat).from_select(
+            ["status", "count"],
+            select(Suggestion.status, func.count())
+            .where(Suggestion.status.is_not(None))
+            .group_by(Suggestion.status),
+        )
+    )
+    actual = dict(
+        connection.execute(select(SuggestionStat.status, SuggestionStat.count)).all()
+    )
+    return {
+        status: actual.get(status, 0) - stored.get(status, 0)
+        for status in stored.keys() | actual.keys()
+        if actual.get(status, 0) != stored.get(status, 0)
+    }
+
+
+async def reconcile_periodically(engine: AsyncEngine):
+    """Фоновая сверка счетчиков (запускается из lifespan)"""
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
+        try:
+            async with engine.begin() as connection:
+                drift = await connection.run_sync(reconcile_status_counts)
+        except Exception as e:  # сверка повторится на следующем круге
+            log_stats_drift({"error": str(e)})
+            continue
+        if drift:
+            log_stats_drift(drift)
@@ -0,0 +1,86 @@
+"""Замер фильтрованных выборок списка с составными индексами и без них
+
+Создает временную SQLite-БД через миграции, заполняет ее предложениями и
+сравнивает время страницы списка с фильтром по status и по user_id
+(ORDER BY created_at, id LIMIT 100) до и после удаления индексов.
+
+    python benchmarks/bench_filtered_list.py --rows 200000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from benchmarks.seed import seed  # noqa: E402
+
+COMPOSITE_INDEXES = (
+    "ix_suggestions_status_created_at_id",
+    "ix_suggestions_user_id_created_at_id",
+)
+
+QUERIES = {
+    "status": (
+        "SELECT * FROM suggestions WHERE status = :status "
+        "ORDER BY created_at, id LIMIT 100",
+        {"status": "in_progress"},
+    ),
+    "user_id": (
+        "SELECT * FROM suggestions WHERE user_id = :user_id "
+        "ORDER BY created_at, id LIMIT 100",
+        {"user_id": 42},
+    ),
+}
+
+
+def measure(engine, repeats: int) -> dict:
+    results = {}
+    with engine.connect() as connection:
+        for name, (sql, params) in QUERIES.items():
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                connection.execute(text(sql), params).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            plan = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            results[name] = (statistics.median(timings), plan[-1][-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        seed(engine, args.users, args.rows)
+
+        with_indexes = measure(engine, args.repeats)
+        with engine.begin() as connection:
+            for name in COMPOSITE_INDEXES:
+                connection.execute(text(f"DROP INDEX {name}"))
+            connection.execute(text("ANALYZE"))
+        without_indexes = measure(engine, args.repeats)
+        engine.dispose()
+
+    print(f"rows={args.rows} users={args.users} repeats={args.repeats} (median)")
+    for name in QUERIES:
+        fast, fast_plan = with_indexes[name]
+        slow, slow_plan = without_indexes[name]
+        print(f"\nfilter by {name}:")
+        print(f"  without index: {slow:9.3f} ms  {slow_plan}")
+        print(f"  with index:    {fast:9.3f} ms  {fast_plan}")
+        print(f"  speedup:       {slow / fast:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Замер полнотекстового поиска с ограничением кандидатов и без него
+
+Создает временную SQLite-БД через миграции, заполняет ее предложениями и
+сравнивает время первой страницы поиска (LIMIT 20) по частому слову (есть
+в каждой строке) и по редкому, когда bm25 считается для всех совпадений и
+только для --max-candidates самых новых (см. SEARCH_MAX_CANDIDATES).
+
+    python benchmarks/bench_search.py --rows 300000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from app.search import SEARCH_MAX_CANDIDATES, search_query  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+# seed пишет в каждую строку текст "benchmark row" и заголовок "Suggestion N"
+QUERIES = {
+    "common term": "benchmark",
+    "rare term": "Suggestion 12345",
+}
+
+
+def measure(engine, q: str, max_candidates: int, repeats: int) -> float:
+    query = search_query("sqlite", q, max_candidates=max_candidates).limit(20)
+    timings = []
+    with engine.connect() as connection:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            connection.execute(query).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--max-candidates", type=int, default=SEARCH_MAX_CANDIDATES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        seed(engine, args.users, args.rows)
+        results = {
+            name: (
+                measure(engine, q, 0, args.repeats),
+                measure(engine, q, args.max_candidates, args.repeats),
+            )
+            for name, q in QUERIES.items()
+        }
+        engine.dispose()
+
+    print(f"rows={args.rows} repeats={args.repeats} (median)")
+    for name, (uncapped, capped) in results.items():
+        print(f"\n{name} ({QUERIES[name]!r}):")
+        print(f"  rank all matches:        {uncapped:9.3f} ms")
+        print(f"  rank {args.max_candidates:>6} newest:      {capped:9.3f} ms")
+        print(f"  speedup:                 {uncapped / capped:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
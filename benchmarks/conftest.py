@@ -0,0 +1,6 @@
+# benchmarks/conftest.py
+import os
+import sys
+
+# Добавляем путь к проекту
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
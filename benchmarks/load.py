@@ -0,0 +1,325 @@
+"""Нагрузочный прогон API: RPS и p50/p95/p99 по сценариям
+
+Создает временную SQLite-БД, заполняет ее (benchmarks/seed.py) и гоняет
+смесь запросов register/login/list/get/update/delete либо прямо в ASGI-
+приложение (без сети, но с его lifespan, --target asgi), либо в локальный
+uvicorn (--target uvicorn).
+
+    python benchmarks/load.py --mix read --requests 5000 --concurrency 32
+    python benchmarks/load.py --target uvicorn --mix write
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from itertools import count
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.database читает DATABASE_URL при импорте, поэтому БД прогона задается
+# до первого импорта app (в том числе через benchmarks.seed)
+BENCH_DIR = tempfile.mkdtemp(prefix="suggestion-box-bench-")
+DATABASE_URL = f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}"
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ.setdefault("STATS_RECONCILE_SECONDS", "0")
+# Вся нагрузка идет с одного адреса: с лимитами прогон мерил бы ответы 429
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, select  # noqa: E402
+
+from benchmarks.seed import SEED_PASSWORD, seed, user_email  # noqa: E402
+
+# Доли операций в сценарии
+MIXES = {
+    "read": {"list": 60, "list_cursor": 10, "get": 25, "login": 5},
+    "write": {"create": 40, "update": 40, "delete": 20},
+    "mixed": {
+        "list": 40,
+        "get": 20,
+        "create": 10,
+        "update": 10,
+        "delete": 5,
+        "login": 10,
+        "register": 5,
+    },
+}
+
+
+class State:
+    """Токены вошедших пользователей и id их предложений"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.tokens = {}
+        self.owned = defaultdict(list)
+        self.emails = count()
+        self.cursor = None
+
+    def pick_user(self):
+        user_id = self.rng.choice(list(self.tokens))
+        return user_id, {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+
+async def op_list(client, state):
+    return await client.get("/suggestions", params={"limit": 100})
+
+
+async def op_list_cursor(client, state):
+    params = {"limit": 100, "cursor": state.cursor} if state.cursor else {"limit": 100}
+    response = await client.get("/suggestions", params=params)
+    state.cursor = response.headers.get("X-Next-Cursor")
+    return response
+
+
+async def op_get(client, state):
+    user_id, headers = state.pick_user()
+    if not state.owned[user_id]:
+        return await op_create(client, state)
+    suggestion_id = state.rng.choice(state.owned[user_id])
+    return await client.get(f"/suggestions/{suggestion_id}", headers=headers)
+
+
+async def op_create(client, state):
+    user_id, headers = state.pick_user()
+    response = await client.post(
+        "/suggestions",
+        json={"title": "Load test", "text": "created by benchmarks/load.py"},
+        headers=headers,
+    )
+    if response.status_code == 200:
+        state.owned[user_id].append(response.json()["id"])
+    return response
+
+
+async def op_update(client, state):
+    user_id, headers = state.pick_user()
+    if not state.owned[user_id]:
+        return await op_create(client, state)
+    suggestion_id = state.rng.choice(state.owned[user_id])
+    return await client.put(
+        f"/suggestions/{suggestion_id}",
+        json={"text": f"updated at {time.time()}"},
+        headers=headers,
+    )
+
+
+async def op_delete(client, state):
+    user_id, headers = state.pick_user()
+    if not state.owned[user_id]:
+        return await op_create(client, state)
+    suggestion_id = state.owned[user_id].pop()
+    return await client.delete(f"/suggestions/{suggestion_id}", headers=headers)
+
+
+async def op_login(client, state):
+    user_id = state.rng.choice(list(state.tokens))
+    return await client.post(
+        "/auth/login", json={"email": user_email(user_id), "password": SEED_PASSWORD}
+    )
+
+
+async def op_register(client, state):
+    return await client.post(
+        "/auth/register",
+        json={
+            "email": f"load{next(state.emails)}@example.com",
+            "password": SEED_PASSWORD,
+        },
+    )
+
+
+OPERATIONS = {
+    "list": op_list,
+    "list_cursor": op_list_cursor,
+    "get": op_get,
+    "create": op_create,
+    "update": op_update,
+    "delete": op_delete,
+    "login": op_login,
+    "register": op_register,
+}
+
+
+async def prepare(client, state, engine, logged_in: int):
+    """Логинит первых logged_in пользователей (вне замера)"""
+    for user_id in range(1, logged_in + 1):
+        response = await client.post(
+            "/auth/login",
+            json={"email": user_email(user_id), "password": SEED_PASSWORD},
+        )
+        response.raise_for_status()
+        state.tokens[user_id] = response.json()["access_token"]
+
+    from app.models import Suggestion
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(Suggestion.user_id, Suggestion.id).where(
+                Suggestion.user_id <= logged_in
+            )
+        )
+        for user_id, suggestion_id in rows:
+            state.owned[user_id].append(suggestion_id)
+
+
+async def drive(client, state, mix: dict, requests: int, concurrency: int):
+    """Выполняет requests операций в concurrency параллельных потоков"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    plan = state.rng.choices(names, weights, k=requests)
+    position = iter(plan)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async def worker():
+        for name in position:
+            started = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](client, state)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[name].append((time.perf_counter() - started) * 1000)
+            if failed:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def percentiles(values):
+    if len(values) < 2:
+        return (values[0],) * 3 if values else (0.0,) * 3
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(elapsed: float, latencies: dict, errors: dict):
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{total} requests in {elapsed:.2f} s: {total / elapsed:.1f} req/s")
+    print(
+        f"{'operation':<12}{'count':>8}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}"
+    )
+    rows = sorted(latencies.items()) + [
+        ("all", [value for values in latencies.values() for value in values])
+    ]
+    for name, values in rows:
+        failed = sum(errors.values()) if name == "all" else errors[name]
+        p50, p95, p99 = percentiles(values)
+        print(
+            f"{name:<12}{len(values):>8}{failed:>8}"
+            f"{p50:>8.2f}ms{p95:>8.2f}ms{p99:>8.2f}ms"
+        )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(client, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        await asyncio.sleep(0.2)
+
+
+async def run(args, engine):
+    state = State(random.Random(args.seed))
+    mix = MIXES[args.mix]
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    if args.target == "asgi":
+        from app.main import app
+
+        # ASGITransport не шлет событий lifespan: миграции, прогрев пулов и
+        # подписки кэша запускаются вручную, как при старте воркера gunicorn
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", limits=limits
+            ) as client:
+                await prepare(client, state, engine, args.logged_in)
+                return await drive(client, state, mix, args.requests, args.concurrency)
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=os.environ.copy(),
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30
+        ) as client:
+            await wait_until_ready(client)
+            await prepare(client, state, engine, args.logged_in)
+            return await drive(client, state, mix, args.requests, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--suggestions", type=int, default=50_000)
+    parser.add_argument(
+        "--logged-in", type=int, default=20, help="сколько пользователей шлют запросы"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Строка лога httpx на каждый запрос исказила бы замер
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from app.auth import get_password_hash
+
+    try:
+        engine = create_engine(DATABASE_URL)
+        seed(engine, args.users, args.suggestions, get_password_hash(SEED_PASSWORD))
+        elapsed, latencies, errors = asyncio.run(run(args, engine))
+        engine.dispose()
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    print(
+        f"target={args.target} mix={args.mix} concurrency={args.concurrency} "
+        f"users={args.users} suggestions={args.suggestions}"
+    )
+    report(elapsed, latencies, errors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Заполнение БД пользователями и предложениями для замеров
+
+    python benchmarks/seed.py --database-url sqlite:///./bench.db --users 1000 --suggestions 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+
+from app.migrate import run_migrations  # noqa: E402
+from app.models import Suggestion, User  # noqa: E402
+from app.stats import reconcile_status_counts  # noqa: E402
+
+# Большинство предложений ждут модерации, в работе - единицы процентов
+STATUSES = ("pending", "approved", "rejected", "in_progress")
+STATUS_WEIGHTS = (70, 20, 9, 1)
+
+# Пароль всех засеянных пользователей (для сценариев с логином)
+SEED_PASSWORD = "BenchPass123!"
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@example.com"
+
+
+def seed(
+    engine,
+    users: int,
+    suggestions: int,
+    hashed_password: str = "x",
+    batch: int = 10000,
+):
+    """Создает users пользователей и suggestions предложений со сдвигом по времени
+
+    Схема доводится миграциями; счетчики статусов пересчитываются в конце,
+    так как массовая вставка идет в обход событий ORM.
+    """
+    run_migrations(engine)
+    started = datetime(2024, 1, 1)
+    rng = random.Random(0)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {"id": i, "email": user_email(i), "hashed_password": hashed_password}
+                for i in range(1, users + 1)
+            ],
+        )
+        for offset in range(0, suggestions, batch):
+            connection.execute(
+                insert(Suggestion),
+                [
+                    {
+                        "title": f"Suggestion {i}",
+                        "text": "benchmark row",
+                        "status": rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+                        "user_id": rng.randint(1, users),
+                        "created_at": started + timedelta(seconds=i),
+                        "updated_at": started + timedelta(seconds=i),
+                    }
+                    for i in range(offset, min(offset + batch, suggestions))
+                ],
+            )
+        reconcile_status_counts(connection)
+        if engine.dialect.name == "sqlite":
+            connection.execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--suggestions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    from app.auth import get_password_hash
+
+    engine = create_engine(args.database_url)
+    seed(engine, args.users, args.suggestions, get_password_hash(SEED_PASSWORD))
+    engine.dispose()
+    print(f"seeded users={args.users} suggestions={args.suggestions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Микробенчмарки горячих функций (pytest-benchmark)
+
+Не входят в обычный прогон тестов (testpaths = tests), запускаются через
+make bench-micro: результат сравнивается с сохраненным make bench-baseline.
+"""
+
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.auth import create_access_token, get_password_hash, token_cache, verify_token
+from app.models import Suggestion as SuggestionModel
+from app.rate_limit import MemoryRateStore, RateLimiter
+from app.responses import rows_to_json
+from app.schemas import Suggestion as SuggestionSchema
+
+suggestion_list_adapter = TypeAdapter(List[SuggestionSchema])
+
+
+@pytest.fixture(scope="module")
+def token():
+    return create_access_token({"sub": "1"})
+
+
+@pytest.fixture(scope="module")
+def page():
+    """Страница из 100 предложений, как в GET /suggestions"""
+    started = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    return [
+        SuggestionModel(
+            id=i,
+            title=f"Suggestion {i}",
+            text="Предложение для замера сериализации " * 5,
+            status="pending",
+            user_id=i % 50,
+            created_at=started + timedelta(seconds=i),
+            updated_at=started + timedelta(seconds=i),
+        )
+        for i in range(100)
+    ]
+
+
+def test_verify_token_cached(benchmark, token):
+    verify_token(token)
+    assert benchmark(verify_token, token)["sub"] == "1"
+
+
+def test_verify_token_uncached(benchmark, token):
+    payload = benchmark.pedantic(
+        verify_token, args=(token,), setup=token_cache.clear, rounds=2000
+    )
+    assert payload["sub"] == "1"
+
+
+def test_get_password_hash(benchmark):
+    # Argon2 намеренно медленный: немного раундов достаточно
+    hashed = benchmark.pedantic(
+        get_password_hash, args=("BenchPass123!",), rounds=10, iterations=1
+    )
+    assert hashed.startswith("$argon2")
+
+
+def test_serialize_page_pydantic(benchmark, page):
+    def serialize():
+        return suggestion_list_adapter.dump_json(
+            suggestion_list_adapter.validate_python(page, from_attributes=True)
+        )
+
+    assert benchmark(serialize).startswith(b"[{")
+
+
+def test_serialize_page_orjson(benchmark, page):
+    assert benchmark(rows_to_json, page).startswith(b"[{")
+
+
+def test_rate_limit_check(benchmark):
+    # Проверка на каждый пишущий запрос: должна укладываться в десятки мкс.
+    # Корутина выполняется без event loop: хранилище в памяти не ждет ввода-вывода
+    limiter = RateLimiter(MemoryRateStore(), rate=1e9, burst=10**9)
+    clients = [f"10.0.{i // 256}.{i % 256}" for i in range(10_000)]
+    position = iter(range(10**9))
+
+    def check():
+        coroutine = limiter.check_request(clients[next(position) % len(clients)])
+        try:
+            coroutine.send(None)
+        except StopIteration as done:
+            return done.value
+        raise RuntimeError("memory store should not suspend")
+
+    assert benchmark(check) == 0
@@ -0,0 +1,54 @@
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.migrate import include_object
+from app.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def _database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+
+
+def _configure(**kwargs):
+    url = kwargs.get("url") or str(kwargs["connection"].engine.url)
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite не умеет ALTER большинства ограничений: таблица пересоздается
+        render_as_batch=url.startswith("sqlite"),
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    """Генерация SQL без подключения (alembic upgrade head --sql)"""
+    _configure(url=_database_url(), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # app.migrate передает уже открытое соединение, CLI подключается сам
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(_database_url())
+    with engine.connect() as connection:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
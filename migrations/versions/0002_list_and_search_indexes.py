@@ -0,0 +1,88 @@
+"""list and search indexes
+
+Составные индексы под выборки списка (keyset по created_at, id, в том числе
+с фильтром по status и по user_id) и полнотекстовый индекс.
+
+Часть индексов могла уже появиться через create_all, поэтому все создается
+с IF NOT EXISTS.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+LIST_INDEXES = {
+    "ix_suggestions_created_at_id": ["created_at", "id"],
+    "ix_suggestions_status_created_at_id": ["status", "created_at", "id"],
+    "ix_suggestions_user_id_created_at_id": ["user_id", "created_at", "id"],
+}
+
+# DDL поиска зафиксирован в ревизии: app.search строит по create_all то же
+# самое, совпадение проверяет tests/test_migrations.py
+SQLITE_SEARCH = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS suggestions_fts USING fts5("
+    "title, text, content='suggestions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS suggestions_fts_ai AFTER INSERT ON suggestions "
+    "BEGIN "
+    "INSERT INTO suggestions_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS suggestions_fts_ad AFTER DELETE ON suggestions "
+    "BEGIN "
+    "INSERT INTO suggestions_fts(suggestions_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS suggestions_fts_au "
+    "AFTER UPDATE OF title, text ON suggestions "
+    "BEGIN "
+    "INSERT INTO suggestions_fts(suggestions_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO suggestions_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); "
+    "END",
+    "INSERT INTO suggestions_fts(suggestions_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_SEARCH = [
+    "CREATE INDEX IF NOT EXISTS ix_suggestions_search ON suggestions USING GIN (("
+    "setweight(to_tsvector('simple', coalesce(suggestions.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(suggestions.text, '')), 'B')))",
+]
+
+
+def upgrade():
+    for name, columns in LIST_INDEXES.items():
+        op.create_index(name, "suggestions", columns, if_not_exists=True)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_SEARCH:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        for statement in POSTGRES_SEARCH:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in (
+            "suggestions_fts_ai",
+            "suggestions_fts_ad",
+            "suggestions_fts_au",
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS suggestions_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_suggestions_search")
+
+    for name in LIST_INDEXES:
+        op.drop_index(name, "suggestions", if_exists=True)
@@ -0,0 +1,34 @@
+"""suggestion status counters
+
+Таблица suggestion_stats со счетчиками предложений по статусам,
+заполняется по текущему содержимому suggestions.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "suggestion_stats",
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO suggestion_stats (status, count) "
+        "SELECT status, COUNT(*) FROM suggestions "
+        "WHERE status IS NOT NULL GROUP BY status"
+    )
+
+
+def downgrade():
+    op.drop_table("suggestion_stats")
@@ -1,17 +1,33 @@
 # tests/conftest.py
+import asyncio
 import os
 import sys
+import threading
 
 import pytest
+from fakeredis import TcpFakeServer
 from fastapi.testclient import TestClient
+from redis import Redis
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 # Добавляем путь к проекту
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import Base, get_db
+# Тестовое окружение: превышение лимита SQL-запросов поднимает предупреждение
+os.environ.setdefault("APP_ENV", "test")
+# Лимиты запросов проверяются отдельно (test_rate_limit.py), остальным тестам
+# они бы мешали
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from app import database, dependencies
+from app.database import Base, get_db, recent_writers
+from app.dependencies import get_read_db, user_cache
 from app.main import app
+from app.rate_limit import rate_limiter
+from app.response_cache import response_cache
 
 # Тестовая база данных в памяти
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -21,6 +37,28 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient поднимает новый event loop на каждый запрос, поэтому без пула
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///./test.db",
+    connect_args={"check_same_thread": False},
+    poolclass=NullPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+def pytest_configure(config):
+    # N+1 в эндпоинте должен ронять тест, а не теряться в сводке предупреждений
+    config.addinivalue_line("filterwarnings", "error::app.metrics.QueryBudgetWarning")
+
+
+async def reset_caches():
+    await recent_writers.clear()
+    await user_cache.clear()
+    await response_cache.clear()
+    await rate_limiter.clear()
+
 
 @pytest.fixture(scope="function")
 def test_db():
@@ -38,13 +76,14 @@ def test_db():
 def client(test_db):
     """Тестовый клиент FastAPI"""
 
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            pass
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # id пользователей повторяются между тестами, кэш не должен их смешивать
+    asyncio.run(reset_caches())
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -70,3 +109,37 @@ def test_suggestion(client, test_user):
     suggestion_data = {"title": "Test Suggestion", "text": "This is a test suggestion"}
     response = client.post("/suggestions", json=suggestion_data, headers=headers)
     return response.json()["id"]
+
+
+@pytest.fixture
+def redis_server():
+    """Локальный сервер с протоколом Redis (fakeredis) на свободном порту"""
+    server = TcpFakeServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.client = Redis.from_url(server.url)
+    yield server
+    server.client.close()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    """Пустая реплика рядом с тестовой БД; get_read_db не подменяется"""
+    path = tmp_path / "replica.db"
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    replica_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=NullPool
+    )
+    monkeypatch.setattr(database, "read_engine", replica_engine)
+    monkeypatch.setattr(dependencies, "AsyncSessionLocal", TestingAsyncSessionLocal)
+    monkeypatch.setattr(
+        dependencies,
+        "ReadSessionLocal",
+        async_sessionmaker(replica_engine, expire_on_commit=False),
+    )
+    app.dependency_overrides.pop(get_read_db)
+    yield replica_engine
+    asyncio.run(database.recent_writers.clear())
@@ -1,4 +1,11 @@
 # tests/test_auth.py
+import asyncio
+
+from sqlalchemy import update
+
+from app import auth
+from app.dependencies import user_cache
+from app.models import User
 
 
 class TestAuthentication:
@@ -39,8 +46,94 @@ class TestAuthentication:
         assert response.json()["email"] == "test@example.com"
         assert "id" in response.json()
 
+    def test_current_user_cached_and_invalidated(self, client, test_user, test_db):
+        """Пользователь берется из кэша и сбрасывается при смене роли"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        client.get("/debug/my-info", headers=headers)
+        hits_before = user_cache.hits
+
+        response = client.get("/debug/my-info", headers=headers)
+        assert response.json()["role"] == "user"
+        assert user_cache.hits == hits_before + 1
+
+        user = test_db.query(User).filter(User.email == "test@example.com").first()
+        user.role = "moderator"
+        test_db.commit()
+
+        response = client.get("/debug/my-info", headers=headers)
+        assert response.json()["role"] == "moderator"
+
+    def test_user_cache_invalidated_on_commit(self, client, test_user, test_db):
+        """Кэш сбрасывается после коммита, а не при flush
+
+        Запрос между flush и коммитом еще читает старую строку; после
+        коммита новая роль видна сразу, а откат ничего не сбрасывает.
+        """
+        headers = {"Authorization": f"Bearer {test_user}"}
+        user = test_db.query(User).filter(User.email == "test@example.com").first()
+
+        user.role = "moderator"
+        test_db.flush()
+        assert client.get("/debug/my-info", headers=headers).json()["role"] == "user"
+        test_db.rollback()
+        hits_before = user_cache.hits
+        assert client.get("/debug/my-info", headers=headers).json()["role"] == "user"
+        assert user_cache.hits == hits_before + 1
+
+        user.role = "moderator"
+        test_db.flush()
+        client.get("/debug/my-info", headers=headers)
+        test_db.commit()
+        response = client.get("/debug/my-info", headers=headers)
+        assert response.json()["role"] == "moderator"
+
+    def test_bulk_user_update_invalidates_cache(self, client, test_user, test_db):
+        """update(User) через сессию тоже сбрасывает кэш"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        client.get("/debug/my-info", headers=headers)
+
+        test_db.execute(update(User).values(is_active=False))
+        test_db.commit()
+
+        response = client.get("/debug/my-info", headers=headers)
+        assert response.json()["is_active"] is False
+
+    def test_sync_commit_inside_event_loop(self, client, test_user, test_db):
+        """Коммит синхронной сессии из работающего event loop сбрасывает кэш"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        client.get("/debug/my-info", headers=headers)
+        user = test_db.query(User).filter(User.email == "test@example.com").first()
+
+        async def main():
+            user.role = "moderator"
+            test_db.commit()
+
+        asyncio.run(main())
+
+        response = client.get("/debug/my-info", headers=headers)
+        assert response.json()["role"] == "moderator"
+
+    def test_verify_token_cached(self):
+        """Повторная проверка того же токена обслуживается из кэша"""
+        token = auth.create_access_token(data={"sub": "42"})
+        auth.verify_token(token)
+        hits_before = auth.token_cache.hits
+
+        payload = auth.verify_token(token)
+
+        assert payload["sub"] == "42"
+        assert auth.token_cache.hits == hits_before + 1
+
     # ОТРИЦАТЕЛЬНЫЕ ТЕСТЫ
 
+    def test_tampered_token_not_served_from_cache(self):
+        """Измененный токен не совпадает с кэшем и отклоняется"""
+        token = auth.create_access_token(data={"sub": "42"})
+        auth.verify_token(token)
+
+        header_payload = token.rsplit(".", 1)[0]
+        assert auth.verify_token(f"{header_payload}.forged-signature") is None
+
     def test_register_duplicate_email(self, client):
         """Регистрация с уже существующим email"""
         user_data = {"email": "duplicate@example.com", "password": "SecurePass123!"}
@@ -66,6 +159,17 @@ class TestAuthentication:
         assert response.status_code == 401
         assert "incorrect" in response.json()["detail"].lower()
 
+    def test_login_unknown_email_still_verifies_password(self, client):
+        """Вход с незарегистрированным email проверяет пароль, как и обычный"""
+        calls = auth.hash_metrics["calls"]
+        login_data = {"email": "nobody@example.com", "password": "SecurePass123!"}
+
+        response = client.post("/auth/login", json=login_data)
+
+        assert response.status_code == 401
+        assert auth._dummy_hash is not None
+        assert auth.hash_metrics["calls"] > calls
+
     def test_register_short_password(self, client):
         """Регистрация с коротким паролем"""
         user_data = {
@@ -77,3 +181,13 @@ class TestAuthentication:
 
         assert response.status_code == 400
         assert "8 characters" in response.json()["detail"].lower()
+
+    def test_register_hash_queue_full(self, client, monkeypatch):
+        """При переполненной очереди хэширования возвращается 503 с Retry-After"""
+        monkeypatch.setattr(auth, "HASH_QUEUE_LIMIT", 0)
+        user_data = {"email": "busy@example.com", "password": "SecurePass123!"}
+
+        response = client.post("/auth/register", json=user_data)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(auth.HASH_RETRY_AFTER_SECONDS)
@@ -0,0 +1,309 @@
+# tests/test_cache.py
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.cache import (
+    CACHE_KEY_PREFIX,
+    CacheBackend,
+    InProcessCache,
+    MemoryCache,
+    RedisCache,
+    SingleFlight,
+)
+
+
+def _subscribers(server, namespace: str) -> int:
+    channel = f"{CACHE_KEY_PREFIX}:invalidate:{namespace}"
+    return dict(server.client.pubsub_numsub(channel))[channel.encode()]
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestInProcessCache:
+    """Тесты локального кэша"""
+
+    def test_lru_eviction_keeps_counters(self):
+        """Вытеснение по размеру не трогает счетчики поколений"""
+        cache = InProcessCache(maxsize=2, ttl=60)
+        cache.incr("generation")
+        cache.set_many({"a": 1, "b": 2})
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+        assert cache.get_counter("generation") == 1
+
+    def test_ttl_expiry(self):
+        """Запись с истекшим ttl считается промахом"""
+        cache = InProcessCache(maxsize=10, ttl=60)
+        cache.set("key", "value", ttl=-1)
+
+        assert cache.get("key") is None
+        assert cache.misses == 1
+
+
+class TestMemoryCache:
+    """Тесты кэша в памяти воркера через общий интерфейс"""
+
+    def test_backend_is_abstract(self):
+        """Кэш без операций интерфейса не создается"""
+
+        class Partial(CacheBackend):
+            async def get_many(self, keys):
+                return {}
+
+        with pytest.raises(TypeError):
+            Partial()
+
+    def test_async_interface(self):
+        cache = MemoryCache(maxsize=10, ttl=60)
+
+        async def main():
+            await cache.set_many({"a": 1, "b": b"2"})
+            await cache.delete("a")
+            await cache.incr("generation")
+            return (
+                await cache.get_many(["a", "b"]),
+                await cache.get("b"),
+                await cache.get_counter("generation"),
+            )
+
+        assert asyncio.run(main()) == ({"b": b"2"}, b"2", 1)
+        assert cache.hits == 2 and cache.misses == 1
+
+
+class TestRedisCache:
+    """Тесты общего кэша на локальном сервере с протоколом Redis"""
+
+    def test_round_trip_and_batching(self, redis_server):
+        """Значения переживают сериализацию, get_many возвращает найденные"""
+        cache = RedisCache(redis_server.url, "test", ttl=60)
+
+        async def main():
+            await cache.set_many({"user": {"id": 1, "role": "user"}, "page": b"[1,2]"})
+            found = await cache.get_many(["user", "page", "absent"])
+            await cache.delete("user")
+            deleted = await cache.get("user")
+            await cache.close()
+            return found, deleted
+
+        found, deleted = asyncio.run(main())
+        assert found == {"user": {"id": 1, "role": "user"}, "page": b"[1,2]"}
+        assert cache.hits == 2 and cache.misses == 2
+        assert deleted is None
+        assert redis_server.client.pttl(cache.key("page")) > 0
+
+    def test_counter_shared_between_workers(self, redis_server):
+        """Поколение, увеличенное одним воркером, видят остальные"""
+        worker_a = RedisCache(redis_server.url, "responses", ttl=60)
+        worker_b = RedisCache(redis_server.url, "responses", ttl=60)
+
+        async def main():
+            await worker_a.incr("generation")
+            await worker_a.incr("generation")
+            shared = await worker_b.get_counter("generation")
+            await worker_b.clear()
+            cleared = await worker_a.get_counter("generation")
+            await worker_a.close()
+            await worker_b.close()
+            return shared, cleared
+
+        assert asyncio.run(main()) == (2, 0)
+
+    def test_new_event_loop_gets_new_client(self, redis_server):
+        """Соединения привязаны к loop: в новом loop кэш продолжает работать"""
+        cache = RedisCache(redis_server.url, "test", ttl=60)
+
+        asyncio.run(cache.set("key", "value"))
+
+        assert asyncio.run(cache.get("key")) == "value"
+        assert cache.errors == 0
+
+    def test_requests_do_not_block_event_loop(self, redis_server):
+        """Пока кэш ждет сервер, другие корутины выполняются"""
+        cache = RedisCache(redis_server.url, "test", ttl=60)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        async def main():
+            task = asyncio.create_task(ticker())
+            for i in range(20):
+                await cache.set(str(i), i)
+            task.cancel()
+            await cache.close()
+
+        asyncio.run(main())
+        assert ticks >= 20
+
+    def test_invalidation_reaches_other_worker_near_cache(self, redis_server):
+        """Удаление ключа в одном воркере сбрасывает локальную копию в другом"""
+        worker_a = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        worker_b = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        worker_a.start()
+        worker_b.start()
+        assert _wait_for(lambda: _subscribers(redis_server, "users") == 2)
+
+        async def main():
+            await worker_a.set("1", {"role": "user"})
+            assert await worker_b.get("1") == {"role": "user"}
+            assert worker_b.near.get("1") == {"role": "user"}
+
+            await worker_a.delete("1")
+
+            assert await asyncio.to_thread(
+                _wait_for, lambda: worker_b.near.get("1") is None
+            )
+            assert await worker_b.get("1") is None
+            await worker_a.close()
+            await worker_b.close()
+
+        asyncio.run(main())
+
+    def test_subscription_follows_start_and_close(self, redis_server):
+        """Создание кэша (импорт модуля) ничего не запускает: поток подписки
+        и локальная копия живут от start() до close()"""
+        cache = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        assert cache._subscriber is None and cache.near is None
+
+        cache.start()
+        subscriber = cache._subscriber
+        assert _wait_for(lambda: _subscribers(redis_server, "users") == 1)
+
+        async def main():
+            await cache.set("1", "cached")
+            assert cache.near.get("1") == "cached"
+            await cache.close()
+            # Без подписки кэш работает напрямую с сервером
+            assert await cache.get("1") == "cached"
+            await cache.close()
+
+        asyncio.run(main())
+        assert cache.near is None and not subscriber.is_alive()
+        assert _wait_for(lambda: _subscribers(redis_server, "users") == 0)
+
+    def test_after_fork_restarts_subscription(self, redis_server):
+        """После fork кэш заводит свое соединение и поток подписки"""
+        worker = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        other = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        worker.start()
+        other.start()
+        assert _wait_for(lambda: _subscribers(redis_server, "users") == 2)
+        inherited = worker._subscriber
+
+        worker._after_fork()  # то же, что делает os.register_at_fork в потомке
+
+        assert worker._subscriber is not inherited and worker._subscriber.is_alive()
+        assert _wait_for(lambda: _subscribers(redis_server, "users") == 3)
+
+        async def main():
+            await worker.set("1", "cached")
+            assert await worker.get("1") == "cached"
+            assert worker.near.get("1") == "cached"
+            await other.delete("1")
+            assert await asyncio.to_thread(
+                _wait_for, lambda: worker.near.get("1") is None
+            )
+            await worker.close()
+            await other.close()
+
+        asyncio.run(main())
+
+    def test_invalidate_sync(self, redis_server):
+        """Синхронный сброс удаляет ключи и локальные копии других воркеров"""
+        worker = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        other = RedisCache(redis_server.url, "users", ttl=60, near_cache_size=10)
+        worker.start()
+        assert _wait_for(lambda: _subscribers(redis_server, "users") == 1)
+
+        async def main():
+            await worker.set_many({"1": "a", "2": "b"})
+            assert worker.near.get("1") == "a"
+
+            other.invalidate_sync(["1"])
+            assert await asyncio.to_thread(
+                _wait_for, lambda: worker.near.get("1") is None
+            )
+            assert await worker.get("1") is None
+            assert await worker.get("2") == "b"
+
+            other.invalidate_sync()
+            assert await asyncio.to_thread(
+                _wait_for, lambda: worker.near.get("2") is None
+            )
+            await worker.close()
+
+        asyncio.run(main())
+        assert redis_server.client.keys(f"{CACHE_KEY_PREFIX}:users:*") == []
+        assert other.errors == 0
+
+    def test_unavailable_server_is_a_miss(self):
+        """Недоступный сервер не ломает запросы: чтение - промах, запись - пропуск"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        cache = RedisCache(f"redis://127.0.0.1:{port}/0", "test", ttl=60)
+
+        async def main():
+            await cache.set("key", "value")
+            return await cache.get("key", "default")
+
+        assert asyncio.run(main()) == "default"
+        assert cache.errors == 1  # повторное подключение отложено
+
+
+class TestSingleFlight:
+    """Тесты склейки одновременных загрузок"""
+
+    def test_concurrent_misses_load_once(self):
+        """Десять одновременных промахов выполняют одну загрузку"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def main():
+            return await asyncio.gather(*(flight.do("key", loader) for _ in range(10)))
+
+        assert asyncio.run(main()) == ["value"] * 10
+        assert calls == 1
+
+    def test_error_shared_with_waiters(self):
+        """Ошибка загрузки получают все ожидающие, следующий вызов грузит заново"""
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("db down")
+
+        async def recovered():
+            return "value"
+
+        async def main():
+            results = await asyncio.gather(
+                *(flight.do("key", failing) for _ in range(3)),
+                return_exceptions=True,
+            )
+            return results, await flight.do("key", recovered)
+
+        results, value = asyncio.run(main())
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert value == "value"
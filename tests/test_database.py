@@ -0,0 +1,78 @@
+# tests/test_database.py
+import asyncio
+import sqlite3
+
+from app import database
+from app.database import (
+    engine_options,
+    mark_user_write,
+    set_sqlite_pragmas,
+    to_async_url,
+    wrote_recently,
+)
+
+
+class TestDatabaseConfig:
+    """Тесты настройки подключения к БД"""
+
+    def test_sqlite_pragmas_applied(self, tmp_path):
+        """Новое SQLite-соединение переводится в WAL с настроенными pragma"""
+        connection = sqlite3.connect(tmp_path / "pragmas.db")
+
+        set_sqlite_pragmas(connection)
+
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert connection.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        connection.close()
+
+    def test_pool_options_only_for_server_databases(self):
+        """Параметры пула передаются только серверным СУБД"""
+        assert "pool_size" not in engine_options("sqlite:///./app.db")
+        assert engine_options("postgresql://db/app")["pool_pre_ping"] is True
+
+    def test_async_driver_selected(self):
+        """Для async-движка подставляется async-драйвер"""
+        assert to_async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+        assert to_async_url("postgresql://db/app") == "postgresql+asyncpg://db/app"
+
+    def test_read_your_writes_window(self, monkeypatch):
+        """После записи пользователь читает из основной БД, пока открыто окно"""
+        monkeypatch.setattr(database, "read_engine", object())  # реплика задана
+
+        async def main():
+            await mark_user_write(101)
+            assert await wrote_recently(101)
+            assert not await wrote_recently(102)
+
+            monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0)
+            await mark_user_write(103)
+            assert not await wrote_recently(103)
+
+        asyncio.run(main())
+
+    def test_no_window_without_replica(self):
+        """Без реплики отметки о записи не ставятся: читать и так из основной БД"""
+
+        async def main():
+            await mark_user_write(104)
+            return await wrote_recently(104)
+
+        assert asyncio.run(main()) is False
+
+
+class TestReadReplicaRouting:
+    """get_read_db: реплика вне окна read-your-writes, основная БД внутри"""
+
+    def test_reads_follow_write_window(self, client, test_user, replica):
+        headers = {"Authorization": f"Bearer {test_user}"}
+        client.post("/suggestions", json={"title": "T", "text": "x"}, headers=headers)
+
+        # Автор только что писал: видит свою запись из основной БД
+        mine = client.get("/me/suggestions", headers=headers).json()
+        assert [item["title"] for item in mine] == ["T"]
+        # Остальные читают из реплики, которая еще не догнала
+        assert client.get("/suggestions/stats").json()["total"] == 0
+
+        asyncio.run(database.recent_writers.clear())  # окно закрылось
+        assert client.get("/me/suggestions", headers=headers).json() == []
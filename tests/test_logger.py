@@ -0,0 +1,157 @@
+# tests/test_logger.py
+import io
+import json
+import logging
+import queue
+
+from app import logger
+from app.logger import (
+    BatchQueueListener,
+    BatchStreamHandler,
+    BoundedQueueHandler,
+    CompressingRotatingFileHandler,
+    JsonFormatter,
+    LogEvent,
+)
+
+
+def make_record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+class TestLoggingPipeline:
+    """Тесты очереди логирования"""
+
+    def test_listener_drains_queue_on_stop(self):
+        """При остановке слушатель дописывает все записи из очереди"""
+        log_queue = queue.Queue(maxsize=100)
+        stream = io.StringIO()
+        handler = BatchStreamHandler(stream)
+        listener = BatchQueueListener(log_queue, handler, batch_size=8)
+        queue_handler = BoundedQueueHandler(log_queue)
+
+        listener.start()
+        for i in range(20):
+            queue_handler.handle(make_record(f"message {i}"))
+        listener.stop()
+
+        assert stream.getvalue().splitlines() == [f"message {i}" for i in range(20)]
+
+    def test_setup_installs_queue_handler_on_configured_root(
+        self, tmp_path, monkeypatch
+    ):
+        """Очередь ставится и тогда, когда у корневого логгера уже есть хэндлеры"""
+        root = logging.getLogger()
+        existing = logging.NullHandler()
+        root.addHandler(existing)
+        monkeypatch.setattr(logger, "LOG_DIR", str(tmp_path))
+        try:
+            logger.setup_logging()
+            assert logger.queue_handler in root.handlers
+            assert existing in root.handlers
+        finally:
+            logger.stop_logging()
+            root.removeHandler(existing)
+
+        assert logger.queue_handler not in root.handlers
+
+    def test_full_queue_drops_and_counts(self):
+        """При переполнении очереди запись отбрасывается без блокировки"""
+        log_queue = queue.Queue(maxsize=1)
+        queue_handler = BoundedQueueHandler(log_queue, policy="drop")
+
+        queue_handler.handle(make_record("kept"))
+        queue_handler.handle(make_record("dropped"))
+
+        assert log_queue.qsize() == 1
+        assert queue_handler.dropped == 1
+
+    def test_json_formatter_emits_event_fields(self):
+        """Структурированное событие сериализуется в JSON с полями события"""
+        event = LogEvent(
+            "API",
+            method="GET",
+            path="/suggestions",
+            user_id=7,
+            status=200,
+            duration_ms=1.5,
+        )
+        record = make_record("")
+        record.msg = event
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        assert payload["event"] == "API"
+        assert payload["path"] == "/suggestions"
+        assert payload["status"] == 200
+        assert payload["duration_ms"] == 1.5
+
+    def test_text_format_matches_legacy_line(self):
+        """Текстовый режим сохраняет прежний формат строки"""
+        event = LogEvent(
+            "API", method="GET", path="/", user_id=None, status=200, duration_ms=None
+        )
+
+        assert str(event) == "API - GET / - anonymous - status=200"
+
+    def test_details_stay_structured(self):
+        """Подробности события - отдельные поля в JSON и пары key=value в тексте"""
+        event = LogEvent(
+            "SECURITY",
+            event_type="LOGIN_FAILED",
+            user_id=None,
+            details={"email": "a@example.com", "attempt": 2},
+        )
+        record = make_record("")
+        record.msg = event
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        assert payload["details"] == {"email": "a@example.com", "attempt": 2}
+        assert str(event) == (
+            "SECURITY - LOGIN_FAILED - anonymous - email=a@example.com, attempt=2"
+        )
+
+    def test_queue_handler_defers_formatting(self):
+        """Постановка в очередь не форматирует событие в потоке запроса"""
+        log_queue = queue.Queue(maxsize=10)
+        record = make_record("")
+        record.msg = LogEvent(
+            "USER_ACTION", action="LOGIN_SUCCESS", user_id=1, details={}
+        )
+
+        BoundedQueueHandler(log_queue).handle(record)
+
+        assert isinstance(log_queue.get_nowait().msg, LogEvent)
+
+    def test_rotation_compresses_and_applies_retention(self, tmp_path):
+        """Ротация по размеру сжимает архивы и хранит не больше backup_count"""
+        handler = CompressingRotatingFileHandler(
+            str(tmp_path), max_bytes=50, backup_count=2
+        )
+        for i in range(10):
+            handler.handle(make_record(f"rotating message number {i}"))
+        handler.close()
+
+        archives = sorted(p.name for p in tmp_path.glob("app_*"))
+        assert len(archives) == 2
+        assert all(name.endswith(".log.gz") for name in archives)
+        assert handler.log_files() == ["app.log", *reversed(archives)]
+
+    def test_handlers_with_different_names_keep_separate_archives(self, tmp_path):
+        """Файлы разных воркеров ротируются независимо в одном каталоге"""
+        handlers = [
+            CompressingRotatingFileHandler(str(tmp_path), max_bytes=50, name=name)
+            for name in ("app-0", "app-1")
+        ]
+        for i in range(3):
+            handlers[0].handle(make_record(f"worker zero message number {i}"))
+        handlers[1].handle(make_record("worker one"))
+        for handler in handlers:
+            handler.close()
+
+        current, *archives = handlers[0].log_files()
+        assert current == "app-0.log"
+        assert archives and all(name.startswith("app-0_") for name in archives)
+        assert handlers[1].log_files() == ["app-1.log"]
+        assert (tmp_path / "app-1.log").read_text().strip() == "worker one"
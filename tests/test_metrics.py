@@ -0,0 +1,67 @@
+# tests/test_metrics.py
+import pytest
+
+from app import metrics
+from app.metrics import Histogram, QueryBudgetWarning, registry
+
+
+class TestMetrics:
+    """Тесты метрик запросов"""
+
+    def test_metrics_endpoint_reports_route_templates(self, client, test_suggestion):
+        """Метрики агрегируются по шаблону маршрута, а не по конкретному пути"""
+        registry.reset()
+        client.get("/suggestions")
+        client.get(f"/suggestions/{test_suggestion}")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        body = response.text
+        assert 'route="/suggestions/{suggestion_id}",status="401"' in body
+        assert (
+            'http_request_duration_seconds_count{method="GET",route="/suggestions"} 1'
+            in body
+        )
+        assert "http_requests_in_flight 1" in body
+
+    def test_database_time_is_recorded(self, client):
+        """Время запросов к БД попадает в метрики запроса"""
+        registry.reset()
+        client.get("/suggestions")
+
+        histogram = registry.db_time[("GET", "/suggestions")]
+        assert histogram.count == 1
+        assert histogram.sum > 0
+
+    def test_api_log_line_from_middleware(self, client, test_user, monkeypatch):
+        """Строка API в логе одна на запрос: со статусом, пользователем и временем"""
+        calls = []
+        monkeypatch.setattr(metrics, "log_api_request", lambda *a: calls.append(a))
+
+        client.get("/me/suggestions", headers={"Authorization": f"Bearer {test_user}"})
+        client.get("/suggestions/999")
+
+        (method, path, user_id, status, duration_ms), anonymous = calls
+        assert (method, path, status) == ("GET", "/me/suggestions", 200)
+        assert user_id is not None
+        assert duration_ms > 0
+        assert anonymous[1:4] == ("/suggestions/999", None, 401)
+
+    def test_query_budget_warning(self, client, monkeypatch):
+        """Превышение лимита SQL-запросов на HTTP-запрос поднимает предупреждение"""
+        monkeypatch.setattr(metrics, "QUERY_COUNT_LIMIT", 0)
+
+        with pytest.warns(QueryBudgetWarning, match="GET /health"):
+            client.get("/health")
+
+    def test_histogram_buckets(self):
+        """Значение попадает в первый бакет, граница которого не меньше его"""
+        histogram = Histogram((0.1, 1.0))
+
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+        assert histogram.counts == [1, 1, 1]
+        assert histogram.count == 3
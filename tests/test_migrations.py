@@ -0,0 +1,120 @@
+# tests/test_migrations.py
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrate import alembic_config, check_schema, include_object, run_migrations
+from app.models import Base
+from app.search import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+VERSIONS = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+
+def _engine(tmp_path, name="migrations.db"):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def _revision(engine) -> str:
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT version_num FROM alembic_version")
+        ).scalar()
+
+
+class TestMigrations:
+    """Тесты миграций схемы БД"""
+
+    def test_fresh_database_matches_models(self, tmp_path):
+        """Миграции с нуля дают ту же схему, что описана в моделях"""
+        engine = _engine(tmp_path)
+
+        run_migrations(engine)
+
+        with engine.connect() as connection:
+            context = MigrationContext.configure(
+                connection, opts={"include_object": include_object}
+            )
+            assert compare_metadata(context, Base.metadata) == []
+        indexes = {
+            index["name"] for index in inspect(engine).get_indexes("suggestions")
+        }
+        assert "ix_suggestions_user_id_created_at_id" in indexes
+        assert "suggestions_fts" in inspect(engine).get_table_names()
+        engine.dispose()
+
+    def test_create_all_database_is_stamped_and_upgraded(self, tmp_path):
+        """БД из create_all без alembic_version получает базовую ревизию и индексы"""
+        engine = _engine(tmp_path)
+        with engine.begin() as connection:
+            command.upgrade(alembic_config(connection), "0001")
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(
+                text(
+                    "INSERT INTO users (id, email, hashed_password) "
+                    "VALUES (1, 'a@example.com', 'x')"
+                )
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO suggestions (title, text, status, user_id) "
+                    "VALUES ('Старое', 'предложение до миграций', 'pending', 1)"
+                )
+            )
+
+        run_migrations(engine)
+
+        assert _revision(engine) == "0003"
+        with engine.connect() as connection:
+            found = connection.execute(
+                text(
+                    "SELECT rowid FROM suggestions_fts WHERE suggestions_fts MATCH 'миграций'"
+                )
+            ).all()
+            stats = connection.execute(
+                text("SELECT status, count FROM suggestion_stats")
+            ).all()
+        assert len(found) == 1  # поисковый индекс построен по старым строкам
+        assert stats == [("pending", 1)]  # счетчики заполнены по старым строкам
+        engine.dispose()
+
+    def test_downgrade_to_baseline(self, tmp_path):
+        """Миграция индексов откатывается"""
+        engine = _engine(tmp_path)
+        run_migrations(engine)
+
+        with engine.begin() as connection:
+            command.downgrade(alembic_config(connection), "0001")
+
+        indexes = {
+            index["name"] for index in inspect(engine).get_indexes("suggestions")
+        }
+        assert "ix_suggestions_status_created_at_id" not in indexes
+        assert "suggestions_fts" not in inspect(engine).get_table_names()
+        engine.dispose()
+
+    def test_check_schema_requires_head(self, tmp_path):
+        """Проверка схемы без миграций отказывает, пока БД не на последней ревизии"""
+        engine = _engine(tmp_path)
+        with engine.begin() as connection:
+            command.upgrade(alembic_config(connection), "0002")
+
+        with pytest.raises(RuntimeError, match="0002"):
+            check_schema(engine)
+        run_migrations(engine)
+        assert check_schema(engine) == "0003"
+        engine.dispose()
+
+    def test_search_ddl_matches_migration(self):
+        """create_all строит тот же поисковый индекс, что и ревизия 0002"""
+        path = VERSIONS / "0002_list_and_search_indexes.py"
+        spec = importlib.util.spec_from_file_location("revision_0002", path)
+        revision = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(revision)
+
+        assert revision.SQLITE_SEARCH == SQLITE_SEARCH_DDL
+        assert revision.POSTGRES_SEARCH == POSTGRES_SEARCH_DDL
@@ -0,0 +1,168 @@
+# tests/test_rate_limit.py
+import asyncio
+
+import pytest
+
+from app.cache import RedisCache
+from app.rate_limit import (
+    MemoryRateStore,
+    RateLimiter,
+    SharedRateStore,
+    rate_limiter,
+    sliding_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Включает лимиты для теста; время идет только вручную"""
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "clock", clock)
+    monkeypatch.setattr(rate_limiter, "failure_limit", 3)
+    asyncio.run(rate_limiter.clear())
+    yield clock
+    asyncio.run(rate_limiter.clear())
+
+
+class TestRateLimitMiddleware:
+    """Лимиты запросов к API"""
+
+    def test_write_burst_is_limited(self, client, clock):
+        """Сверх RATE_LIMIT_WRITE_BURST пишущих запросов подряд - 429 с Retry-After"""
+        for _ in range(rate_limiter.write_burst):
+            assert client.post("/suggestions", json={}).status_code != 429
+
+        response = client.post("/suggestions", json={})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert response.json() == {"detail": "Too many requests"}
+        clock.now += 1.5 / rate_limiter.write_rate  # пополнился один токен
+        assert client.post("/suggestions", json={}).status_code != 429
+        assert client.post("/suggestions", json={}).status_code == 429
+
+    def test_auth_limit_is_separate_from_writes(self, client, clock):
+        """Запись не расходует лимит /auth/*: у них разные счетчики"""
+        for _ in range(rate_limiter.write_burst):
+            assert client.post("/suggestions", json={}).status_code != 429
+        assert client.post("/suggestions", json={}).status_code == 429
+        # Пустое тело - 422 без проверки пароля, неудачным входом не считается
+        for _ in range(rate_limiter.burst):
+            assert client.post("/auth/login", json={}).status_code == 422
+
+        assert client.post("/auth/login", json={}).status_code == 429
+
+    def test_reads_are_not_limited(self, client, clock):
+        for _ in range(rate_limiter.burst * 3):
+            assert client.get("/suggestions").status_code == 200
+
+    def test_failed_logins_block_ip(self, client, clock):
+        """После failure_limit неудачных входов вход блокируется до конца окна"""
+        user = {"email": "victim@example.com", "password": "SecurePass123!"}
+        client.post("/auth/register", json=user)
+        wrong = {**user, "password": "WrongPass123!"}
+        for _ in range(rate_limiter.failure_limit):
+            clock.now += 1  # не упираемся в лимит запросов в секунду
+            assert client.post("/auth/login", json=wrong).status_code == 401
+
+        clock.now += 1
+        blocked = client.post("/auth/login", json=user)
+
+        assert blocked.status_code == 429
+        assert 0 < int(blocked.headers["Retry-After"]) <= rate_limiter.failure_window
+        clock.now += 2 * rate_limiter.failure_window
+        assert client.post("/auth/login", json=user).status_code == 200
+
+
+class TestRateLimiter:
+    """Счетчики лимитов без HTTP"""
+
+    def test_clients_are_independent_and_bounded(self):
+        clock = FakeClock()
+        limiter = RateLimiter(
+            MemoryRateStore(shards=1, max_clients=2), rate=1, burst=1, clock=clock
+        )
+
+        async def main():
+            assert await limiter.check_request("10.0.0.1") == 0
+            assert await limiter.check_request("10.0.0.1") == pytest.approx(1.0)
+            assert await limiter.check_request("10.0.0.2") == 0
+            # Третий адрес вытесняет самый давний, его ведро начинается заново
+            assert await limiter.check_request("10.0.0.3") == 0
+            assert await limiter.check_request("10.0.0.1") == 0
+
+        asyncio.run(main())
+
+    def test_failure_window_slides(self):
+        clock = FakeClock(now=0.0)
+        limiter = RateLimiter(
+            MemoryRateStore(), failure_limit=4, failure_window=100, clock=clock
+        )
+
+        async def main():
+            for _ in range(3):
+                assert await limiter.record_login_failure("10.0.0.1") is False
+            # Порог пройден
+            assert await limiter.record_login_failure("10.0.0.1") is True
+            assert await limiter.check_login("10.0.0.1") > 0
+
+            # Половина следующего окна: прошлые 4 неудачи весят как 2
+            clock.now = 150.0
+            assert await limiter.check_login("10.0.0.1") == 0
+
+        asyncio.run(main())
+
+    def test_sliding_retry_after(self):
+        assert sliding_retry_after(1, 2, 0.5, 10, 3) == 0
+        assert sliding_retry_after(4, 0, 0.25, 100, 4) == pytest.approx(75)
+        assert sliding_retry_after(2, 4, 0.25, 100, 4) == pytest.approx(25)
+
+    def test_shared_store_counts_across_workers(self, redis_server):
+        """Два воркера с общим Redis делят один лимит"""
+        clock = FakeClock(now=10.0)
+        workers = [
+            RateLimiter(
+                SharedRateStore(RedisCache(redis_server.url, "rate_limit", ttl=1)),
+                rate=3,
+                burst=3,
+                failure_limit=2,
+                clock=clock,
+            )
+            for _ in range(2)
+        ]
+
+        async def main():
+            for i in range(3):
+                assert await workers[i % 2].check_request("10.0.0.1") == 0
+            assert await workers[0].check_request("10.0.0.1") > 0
+            assert await workers[1].check_request("10.0.0.2") == 0
+
+            await workers[0].record_login_failure("10.0.0.1")
+            await workers[1].record_login_failure("10.0.0.1")
+            assert await workers[0].check_login("10.0.0.1") > 0
+
+        asyncio.run(main())
+
+    def test_shared_store_fails_open(self):
+        """Недоступный Redis не блокирует запросы"""
+        limiter = RateLimiter(
+            SharedRateStore(RedisCache("redis://127.0.0.1:1/0", "rate_limit", ttl=1)),
+            rate=1,
+            burst=1,
+        )
+
+        async def main():
+            assert await limiter.check_request("10.0.0.1") == 0
+            assert await limiter.check_request("10.0.0.1") == 0
+            assert await limiter.check_login("10.0.0.1") == 0
+
+        asyncio.run(main())
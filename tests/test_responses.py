@@ -0,0 +1,91 @@
+# tests/test_responses.py
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.models import Suggestion as SuggestionModel
+from app.responses import rows_to_json, suggestion_to_json
+from app.schemas import Suggestion as SuggestionSchema
+from tests.conftest import TestingSessionLocal
+
+suggestion_adapter = TypeAdapter(SuggestionSchema)
+suggestion_list_adapter = TypeAdapter(List[SuggestionSchema])
+
+
+def _pydantic_json(suggestions) -> bytes:
+    """Прежний ответ: проверка через схему и сериализация pydantic"""
+    return suggestion_list_adapter.dump_json(
+        suggestion_list_adapter.validate_python(suggestions, from_attributes=True)
+    )
+
+
+SAMPLE_TIMES = [
+    datetime(2026, 10, 18, 12, 30, 5, 123456),
+    datetime(2026, 10, 18, 12, 30, 5),  # без микросекунд
+    datetime(2026, 10, 18, 12, 30, 5, 1000),
+    datetime(2026, 10, 18, 12, 30, 5, tzinfo=timezone.utc),
+    datetime(2026, 10, 18, 12, 30, 5, tzinfo=timezone(timedelta(hours=3))),
+]
+
+
+class TestResponseParity:
+    """Быстрый JSON из строк совпадает с ответом через pydantic"""
+
+    @pytest.mark.parametrize("moment", SAMPLE_TIMES)
+    def test_single_suggestion_matches_schema(self, moment):
+        suggestion = SuggestionModel(
+            id=7,
+            title="Кофе в переговорке",
+            text='Кавычки " и \\ обратный слэш,\nперевод строки и эмодзи 🙂',
+            status="pending",
+            user_id=3,
+            created_at=moment,
+            updated_at=moment,
+        )
+
+        assert suggestion_to_json(suggestion) == suggestion_adapter.dump_json(
+            suggestion_adapter.validate_python(suggestion, from_attributes=True)
+        )
+
+    def test_list_matches_schema(self):
+        suggestions = [
+            SuggestionModel(
+                id=i,
+                title=f"S{i}",
+                text="x" * i,
+                status="approved",
+                user_id=i,
+                created_at=moment,
+                updated_at=moment,
+            )
+            for i, moment in enumerate(SAMPLE_TIMES, start=1)
+        ]
+
+        assert rows_to_json(suggestions) == _pydantic_json(suggestions)
+        assert rows_to_json([]) == _pydantic_json([]) == b"[]"
+
+    def test_endpoints_match_schema(self, client, test_user):
+        """Списки и отдельное предложение из API - те же байты, что у pydantic"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        for i in range(3):
+            client.post(
+                "/suggestions",
+                json={"title": f"Парковка {i}", "text": "Больше мест"},
+                headers=headers,
+            )
+        db = TestingSessionLocal()
+        stored = db.query(SuggestionModel).order_by(SuggestionModel.id).all()
+        db.close()
+        expected = _pydantic_json(stored)
+
+        assert client.get("/suggestions").content == expected
+        assert client.get("/me/suggestions", headers=headers).content == expected
+        search = client.get("/suggestions/search", params={"q": "парковка"})
+        assert search.json() == client.get("/suggestions").json()
+        single = client.get(f"/suggestions/{stored[0].id}", headers=headers)
+        assert single.headers["content-type"] == "application/json"
+        assert single.content == suggestion_adapter.dump_json(
+            suggestion_adapter.validate_python(stored[0], from_attributes=True)
+        )
@@ -0,0 +1,174 @@
+# tests/test_server.py
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database, logger, migrate, server
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestServerProfile:
+    """Конфигурация и хуки gunicorn"""
+
+    def test_worker_count_from_env_or_cpus(self, monkeypatch):
+        monkeypatch.setattr(server, "CACHE_BACKEND", "redis")
+        monkeypatch.setattr(server, "RATE_LIMIT_BACKEND", "redis")
+        monkeypatch.setenv("WEB_CONCURRENCY", "3")
+        assert server.worker_count() == 3
+        monkeypatch.setenv("WEB_CONCURRENCY", "0")
+        assert server.worker_count() == 1
+
+        monkeypatch.delenv("WEB_CONCURRENCY")
+        monkeypatch.setattr(server, "available_cpus", lambda: 6)
+        assert server.worker_count() == 6
+
+    def test_single_worker_with_memory_caches(self, monkeypatch):
+        """Кэши в памяти не общие: воркер один, больше - ошибка конфигурации"""
+        monkeypatch.setattr(server, "CACHE_BACKEND", "redis")
+        monkeypatch.setattr(server, "RATE_LIMIT_BACKEND", "memory")
+        monkeypatch.setattr(server, "available_cpus", lambda: 6)
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        assert server.worker_count() == 1
+
+        monkeypatch.setattr(server, "CACHE_BACKEND", "memory")
+        monkeypatch.setenv("WEB_CONCURRENCY", "1")
+        assert server.worker_count() == 1
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        with pytest.raises(ValueError, match="CACHE_BACKEND=redis"):
+            server.worker_count()
+
+    def test_available_cpus_at_least_one(self):
+        assert 1 <= server.available_cpus() <= (os.cpu_count() or 1)
+
+    def test_pre_fork_reuses_free_slot(self):
+        """Новый воркер занимает наименьший слот, освобожденный упавшим"""
+        workers = {}
+        arbiter = SimpleNamespace(WORKERS=workers)
+        for pid in (101, 102, 103):
+            worker = SimpleNamespace()
+            server.pre_fork(arbiter, worker)
+            workers[pid] = worker
+        assert [w.slot for w in workers.values()] == [0, 1, 2]
+
+        del workers[102]
+        replacement = SimpleNamespace()
+        server.pre_fork(arbiter, replacement)
+        assert replacement.slot == 1
+
+    def test_post_fork_gives_worker_own_log_file(self, tmp_path, monkeypatch):
+        """Воркер начинает с пустыми пулами и пишет в свой файл лога"""
+        # Отдельные движки: глобальные нужны остальным тестам
+        engine = create_engine(f"sqlite:///{tmp_path / 'fork.db'}")
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+        monkeypatch.setattr(database, "engine", engine)
+        monkeypatch.setattr(database, "async_engine", async_engine)
+        monkeypatch.setattr(database, "read_engine", async_engine)
+        monkeypatch.setattr(logger, "LOG_FILE_NAME", "app")
+        with engine.connect():
+            pass
+        pool = engine.pool
+
+        server.post_fork(None, SimpleNamespace(slot=2))
+
+        assert engine.pool is not pool
+        assert logger.LOG_FILE_NAME == "app-2"
+        engine.dispose()
+
+    def test_on_starting_migrates_once(self, tmp_path, monkeypatch):
+        """Мастер доводит схему, воркерам остается только проверка"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'master.db'}")
+        monkeypatch.setattr(database, "engine", engine)
+        monkeypatch.setattr(migrate, "DB_MIGRATE_ON_STARTUP", True)
+
+        server.on_starting(None)
+
+        assert migrate.DB_MIGRATE_ON_STARTUP is False
+        assert engine.pool.checkedin() == 0  # воркеры не наследуют соединения
+        migrate.check_schema(engine)
+        engine.dispose()
+
+    def test_gunicorn_serves_and_drains(self, tmp_path, redis_server):
+        """Несколько воркеров отвечают, а по SIGTERM дорабатывают начатый
+        запрос и завершаются, дописав логи"""
+        database_path = tmp_path / "gunicorn.db"
+        port = _free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{database_path}",
+            "PORT": str(port),
+            "HOST": "127.0.0.1",
+            "WEB_CONCURRENCY": "2",
+            "CACHE_BACKEND": "redis",
+            "CACHE_URL": redis_server.url,
+            "LOG_DIR": str(tmp_path / "logs"),
+            "STATS_RECONCILE_SECONDS": "0",
+        }
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "python:app.server"]
+            + ["app.main:app"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    with urllib.request.urlopen(
+                        f"http://127.0.0.1:{port}/health", timeout=1
+                    ) as response:
+                        assert response.status == 200
+                    break
+                except OSError:
+                    assert time.monotonic() < deadline, "gunicorn did not start"
+                    time.sleep(0.2)
+
+            # Запрос начат до SIGTERM: заголовки и половина тела уже у воркера
+            body = orjson.dumps(
+                {"email": "drain@example.com", "password": "SecurePass123!"}
+            )
+            connection = socket.create_connection(("127.0.0.1", port), timeout=30)
+            connection.sendall(
+                b"POST /auth/register HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body[:10]
+            )
+            time.sleep(0.5)
+            process.send_signal(signal.SIGTERM)
+            time.sleep(1)
+            assert process.poll() is None  # воркер ждет конца запроса
+            connection.sendall(body[10:])
+            with connection, connection.makefile("rb") as response:
+                assert response.readline().startswith(b"HTTP/1.1 200")
+
+            assert process.wait(timeout=30) == 0
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+        logs = {path.name for path in (tmp_path / "logs").glob("app-*.log")}
+        assert logs == {"app-0.log", "app-1.log"}
+        with create_engine(f"sqlite:///{database_path}").connect() as connection:
+            assert connection.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalar()
+            assert connection.execute(
+                text("SELECT email FROM users")
+            ).scalars().all() == ["drain@example.com"]
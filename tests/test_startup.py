@@ -0,0 +1,53 @@
+# tests/test_startup.py
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import auth, dependencies, logger, main
+from app.metrics import startup
+
+
+class TestStartup:
+    """Подготовка воркера в lifespan"""
+
+    def test_lifespan_prepares_worker(self, tmp_path, monkeypatch):
+        """Схема, логи, пулы и хэш готовы до первого запроса, этапы замерены"""
+        database = tmp_path / "startup.db"
+        engine = create_engine(f"sqlite:///{database}")
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+        monkeypatch.setattr(main, "engine", engine)
+        monkeypatch.setattr(main, "async_engine", async_engine)
+        monkeypatch.setattr(main, "read_engine", async_engine)
+        # Запросы внутри теста тоже идут во временную БД, а не в ./app.db
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+        monkeypatch.setattr(dependencies, "AsyncSessionLocal", sessions)
+        monkeypatch.setattr(dependencies, "ReadSessionLocal", sessions)
+        monkeypatch.setattr(main, "STATS_RECONCILE_SECONDS", 0)
+        monkeypatch.setattr(logger, "LOG_DIR", str(tmp_path / "logs"))
+        # Другие тесты уже отправляли запросы без lifespan
+        monkeypatch.setattr(startup, "first_request", None)
+        root = logging.getLogger()
+        root_handlers, root_level = root.handlers[:], root.level
+        try:
+            with TestClient(main.app) as client:
+                assert auth._dummy_hash is not None
+                assert async_engine.pool.checkedin() >= 1  # соединения открыты
+                assert (tmp_path / "logs").is_dir()
+                client.get("/health")
+                metrics = client.get("/metrics").text
+        finally:
+            root.handlers[:], root.level = root_handlers, root_level
+            engine.dispose()
+
+        with create_engine(f"sqlite:///{database}").connect() as connection:
+            revision = connection.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalar()
+        assert revision == "0003"
+        for step in ("import", "logging", "schema", "db_pool", "password_hashing"):
+            assert f'app_startup_step_seconds{{step="{step}"}}' in metrics
+        assert "app_startup_ready_seconds" in metrics
+        assert "app_time_to_first_request_seconds" in metrics
+        assert startup.first_request >= startup.ready
@@ -1,4 +1,15 @@
 # tests/test_suggestions.py
+import asyncio
+import base64
+import json
+
+from sqlalchemy import text
+
+from app import bulk, search
+from app.models import User
+from app.response_cache import response_cache
+from app.search import search_query
+from app.stats import reconcile_status_counts
 
 
 class TestSuggestions:
@@ -52,8 +63,425 @@ class TestSuggestions:
         assert isinstance(response.json(), list)
         assert len(response.json()) > 0
 
+    def test_get_suggestions_cursor_pagination(self, client, test_user):
+        """Keyset-пагинация по курсору проходит список без пропусков и повторов"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        for i in range(3):
+            client.post(
+                "/suggestions",
+                json={"title": f"Cursor {i}", "text": "Cursor pagination"},
+                headers=headers,
+            )
+
+        first_page = client.get("/suggestions", params={"limit": 2})
+        assert first_page.status_code == 200
+        assert len(first_page.json()) == 2
+        cursor = first_page.headers["X-Next-Cursor"]
+
+        second_page = client.get("/suggestions", params={"limit": 2, "cursor": cursor})
+        assert second_page.status_code == 200
+        assert [s["title"] for s in second_page.json()] == ["Cursor 2"]
+        assert "X-Next-Cursor" not in second_page.headers
+
+    def test_get_suggestions_etag_not_modified(self, client, test_user):
+        """Повторный запрос с актуальным ETag получает 304, запись меняет ETag"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        suggestion = {"title": "Cached", "text": "Cached listing"}
+        client.post("/suggestions", json=suggestion, headers=headers)
+
+        first = client.get("/suggestions")
+        etag = first.headers["ETag"]
+        not_modified = client.get("/suggestions", headers={"If-None-Match": etag})
+
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+        client.post("/suggestions", json=suggestion, headers=headers)
+        changed = client.get("/suggestions", headers={"If-None-Match": etag})
+
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert len(changed.json()) == len(first.json()) + 1
+
+    def test_etag_follows_content_not_generation(self, client, test_user):
+        """Обнуленный счетчик поколений (перезапуск, другой воркер) не дает 304"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        etag = client.get("/suggestions").headers["ETag"]
+        client.post("/suggestions", json={"title": "T", "text": "x"}, headers=headers)
+
+        asyncio.run(response_cache.clear())  # поколение снова 0
+        response = client.get("/suggestions", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+
+    def test_writer_bypasses_response_cache(self, client, test_user, replica):
+        """В окне read-your-writes автор не получает страницу реплики из кэша"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        client.post("/suggestions", json={"title": "T", "text": "x"}, headers=headers)
+
+        # Другой читатель кэширует отстающую страницу уже под новым поколением
+        assert client.get("/suggestions").json() == []
+
+        mine = client.get("/suggestions", headers=headers)
+        assert [item["title"] for item in mine.json()] == ["T"]
+        assert mine.headers["ETag"] != client.get("/suggestions").headers["ETag"]
+
+    def test_list_rejects_out_of_range_paging(self, client):
+        """limit=-1 не превращается в LIMIT -1 (вся таблица) в SQLite"""
+        for params in ({"limit": -1}, {"limit": 0}, {"skip": -1}):
+            response = client.get("/suggestions", params=params)
+            assert response.status_code == 422, params
+
+    def test_list_rejects_limit_above_page_size(self, client, test_user):
+        """limit больше 100 со skip - явный 422, а не урезанная страница"""
+        for params in ({"limit": 101}, {"limit": 500, "skip": 100}):
+            response = client.get("/suggestions", params=params)
+            assert response.status_code == 422, params
+            assert response.json()["detail"][0]["loc"] == ["query", "limit"]
+
+    def test_bulk_create_skips_oversized_lines(self, client, test_user, monkeypatch):
+        """Слишком длинная строка - ошибка этой строки, а не всего импорта"""
+        monkeypatch.setattr(bulk, "BULK_MAX_LINE_BYTES", 64)
+        headers = {"Authorization": f"Bearer {test_user}"}
+        body = "\n".join(
+            [
+                json.dumps({"title": "First", "text": "one"}),
+                json.dumps({"title": "Long", "text": "x" * 100}),
+                json.dumps({"title": "Third", "text": "three"}),
+            ]
+        )
+
+        response = client.post("/suggestions/bulk", content=body, headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 2
+        assert response.json()["errors"] == [
+            {"line": 2, "error": "line exceeds 64 bytes"}
+        ]
+
+    def test_ndjson_lines_skip_oversized_across_chunks(self, monkeypatch):
+        """Длинная строка, пришедшая несколькими кусками, не копится в памяти"""
+        monkeypatch.setattr(bulk, "BULK_MAX_LINE_BYTES", 8)
+
+        async def chunks():
+            for chunk in (
+                b"short\nvery long ",
+                b"line, still ",
+                b"going\nok\n",
+                b"tail",
+            ):
+                yield chunk
+
+        async def main():
+            return [item async for item in bulk.iter_ndjson_lines(chunks())]
+
+        assert asyncio.run(main()) == [
+            (1, b"short"),
+            (2, None),
+            (3, b"ok"),
+            (4, b"tail"),
+        ]
+
+    def test_bulk_create_reports_row_errors(self, client, test_user):
+        """NDJSON-импорт вставляет корректные строки и перечисляет ошибочные"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        body = "\n".join(
+            [
+                json.dumps({"title": "First", "text": "one"}),
+                json.dumps({"title": "Second", "text": "two"}),
+                "{not json",
+                json.dumps({"title": "No text"}),
+                "",
+            ]
+        )
+
+        response = client.post(
+            "/suggestions/bulk",
+            content=body,
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["inserted"] == 2
+        assert [error["line"] for error in result["errors"]] == [3, 4]
+        assert "text" in result["errors"][1]["error"]
+        titles = [item["title"] for item in client.get("/suggestions").json()]
+        assert titles == ["First", "Second"]
+
+    def test_export_streams_ndjson_and_csv(self, client, test_user, test_db):
+        """Модератор выгружает все предложения в NDJSON и CSV"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        for title in ("First", "=SUM(A1)"):
+            client.post(
+                "/suggestions", json={"title": title, "text": "x"}, headers=headers
+            )
+        user = test_db.query(User).filter(User.email == "test@example.com").first()
+        user.role = "moderator"
+        test_db.commit()
+
+        response = client.get("/suggestions/export", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["title"] for row in rows] == ["First", "=SUM(A1)"]
+
+        response = client.get(
+            "/suggestions/export", params={"format": "csv"}, headers=headers
+        )
+        lines = response.text.splitlines()
+        assert lines[0] == "id,user_id,title,text,status,created_at,updated_at"
+        assert len(lines) == 3
+        assert ",'=SUM(A1)," in lines[2]  # формула не исполнится в таблице
+
+    def test_search_ranked_and_synced(self, client, test_user):
+        """Поиск находит все слова запроса и следит за изменениями предложений"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        created = {}
+        for title, body in (
+            ("Парковка", "Нужно больше велосипедных парковок"),
+            ("Кофемашина", "Поставить кофемашину у парковки"),
+            ("Столовая", "Расширить меню"),
+        ):
+            response = client.post(
+                "/suggestions", json={"title": title, "text": body}, headers=headers
+            )
+            created[title] = response.json()["id"]
+
+        response = client.get("/suggestions/search", params={"q": "парковка"})
+        assert [item["title"] for item in response.json()] == ["Парковка"]
+
+        response = client.get("/suggestions/search", params={"q": "меню"})
+        assert [item["id"] for item in response.json()] == [created["Столовая"]]
+
+        client.put(
+            f"/suggestions/{created['Столовая']}",
+            json={"text": "Добавить вегетарианское меню"},
+            headers=headers,
+        )
+        client.delete(f"/suggestions/{created['Парковка']}", headers=headers)
+
+        response = client.get("/suggestions/search", params={"q": "вегетарианское"})
+        assert [item["title"] for item in response.json()] == ["Столовая"]
+        response = client.get("/suggestions/search", params={"q": "парковка"})
+        assert response.json() == []
+
+    def test_search_ranks_only_newest_candidates(self, client, test_user, test_db):
+        """Под ранжирование идут только max_candidates самых новых совпадений"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        ids = [
+            client.post(
+                "/suggestions", json={"title": title, "text": body}, headers=headers
+            ).json()["id"]
+            for title, body in (
+                ("Парковка", "Нужна парковка у входа"),
+                ("Кофемашина", "Поставить у входа, где парковка"),
+                ("Столовая", "Столовая рядом, парковка далеко"),
+            )
+        ]
+
+        def found(max_candidates):
+            query = search_query("sqlite", "парковка", max_candidates=max_candidates)
+            return [suggestion.id for suggestion in test_db.scalars(query)]
+
+        # Совпадение в заголовке - самое релевантное, но и самое старое
+        assert found(0)[0] == ids[0]
+        assert found(1000) == found(0)
+        assert sorted(found(2)) == ids[1:]
+
+    def test_search_pages_past_candidate_cap(self, client, test_user, monkeypatch):
+        """Внутри ограничения страницы доходят до старых совпадений, дальше - 400"""
+        response = client.get(
+            "/suggestions/search", params={"q": "парковка", "skip": 990, "limit": 20}
+        )
+        assert response.status_code == 400  # по умолчанию ранжируются 1000
+
+        headers = {"Authorization": f"Bearer {test_user}"}
+        for i in range(5):
+            title = "Парковка" if i == 0 else f"Идея {i}"
+            client.post(
+                "/suggestions",
+                json={"title": title, "text": "парковка"},
+                headers=headers,
+            )
+
+        titles = []
+        for skip in (0, 2, 4):
+            response = client.get(
+                "/suggestions/search",
+                params={"q": "парковка", "skip": skip, "limit": 2},
+            )
+            titles += [item["title"] for item in response.json()]
+        assert titles[0] == "Парковка"  # самое старое, но совпало в заголовке
+        assert sorted(titles) == ["Идея 1", "Идея 2", "Идея 3", "Идея 4", "Парковка"]
+
+        monkeypatch.setattr(search, "SEARCH_MAX_CANDIDATES", 3)
+        response = client.get(
+            "/suggestions/search", params={"q": "парковка", "limit": 3}
+        )
+        assert [item["title"] for item in response.json()] == [
+            "Идея 2",
+            "Идея 3",
+            "Идея 4",
+        ]
+        response = client.get(
+            "/suggestions/search", params={"q": "парковка", "skip": 2, "limit": 2}
+        )
+        assert response.status_code == 400
+
+    def test_my_suggestions_paginated(self, client, test_user, test_db):
+        """Пользователь листает только свои предложения, модератор - любые"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        for i in range(3):
+            client.post(
+                "/suggestions",
+                json={"title": f"Mine {i}", "text": "x"},
+                headers=headers,
+            )
+        other = {"email": "other@example.com", "password": "SecurePass123!"}
+        client.post("/auth/register", json=other)
+        other_token = client.post("/auth/login", json=other).json()["access_token"]
+        other_headers = {"Authorization": f"Bearer {other_token}"}
+        client.post(
+            "/suggestions", json={"title": "Theirs", "text": "x"}, headers=other_headers
+        )
+
+        first = client.get("/me/suggestions", params={"limit": 2}, headers=headers)
+        assert [item["title"] for item in first.json()] == ["Mine 0", "Mine 1"]
+        second = client.get(
+            "/me/suggestions",
+            params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+            headers=headers,
+        )
+        assert [item["title"] for item in second.json()] == ["Mine 2"]
+        assert "X-Next-Cursor" not in second.headers
+
+        owner_id = first.json()[0]["user_id"]
+        response = client.get(
+            "/me/suggestions", params={"user_id": owner_id}, headers=other_headers
+        )
+        assert response.status_code == 403
+
+        moderator = test_db.query(User).filter(User.email == other["email"]).first()
+        moderator.role = "moderator"
+        test_db.commit()
+        response = client.get(
+            "/me/suggestions", params={"user_id": owner_id}, headers=other_headers
+        )
+        assert len(response.json()) == 3
+
+    def test_stats_follow_writes(self, client, test_user):
+        """Счетчики статусов меняются вместе с предложениями"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        ids = [
+            client.post(
+                "/suggestions", json={"title": f"S{i}", "text": "x"}, headers=headers
+            ).json()["id"]
+            for i in range(3)
+        ]
+        client.put(
+            f"/suggestions/{ids[0]}", json={"status": "approved"}, headers=headers
+        )
+        client.put(f"/suggestions/{ids[1]}", json={"title": "Renamed"}, headers=headers)
+        client.delete(f"/suggestions/{ids[2]}", headers=headers)
+        client.post(
+            "/suggestions/bulk",
+            content=json.dumps({"title": "Bulk", "text": "x"}),
+            headers=headers,
+        )
+
+        response = client.get("/suggestions/stats")
+
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["by_status"]["pending"] == 2
+        assert stats["by_status"]["approved"] == 1
+        assert stats["by_status"]["rejected"] == 0
+        assert stats["total"] == 3
+
+    def test_stats_reconciliation_fixes_drift(self, client, test_user, test_db):
+        """Сверка приводит счетчики к фактическому содержимому таблицы"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        client.post("/suggestions", json={"title": "S", "text": "x"}, headers=headers)
+        test_db.execute(text("UPDATE suggestion_stats SET count = 10"))
+        test_db.commit()
+
+        drift = reconcile_status_counts(test_db.connection())
+        test_db.commit()
+
+        assert drift == {"pending": -9}
+        assert client.get("/suggestions/stats").json()["by_status"]["pending"] == 1
+
+    def test_get_suggestions_sparse_fields(self, client, test_user):
+        """fields= оставляет в ответе только запрошенные поля"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+        for i in range(3):
+            client.post(
+                "/suggestions",
+                json={"title": f"S{i}", "text": "x" * 1000},
+                headers=headers,
+            )
+
+        full = client.get("/suggestions").json()
+        response = client.get("/suggestions", params={"fields": "title,id", "limit": 2})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": item["id"], "title": item["title"]} for item in full[:2]
+        ]
+        next_page = client.get(
+            "/suggestions",
+            params={"fields": "id,title", "cursor": response.headers["X-Next-Cursor"]},
+        )
+        assert next_page.json() == [{"id": full[2]["id"], "title": "S2"}]
+        assert response.headers["ETag"] != client.get("/suggestions").headers["ETag"]
+
     # ОТРИЦАТЕЛЬНЫЕ ТЕСТЫ
 
+    def test_get_suggestions_invalid_cursor(self, client):
+        """Некорректный курсор отклоняется с 400"""
+        response = client.get("/suggestions", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+        assert "cursor" in response.json()["detail"].lower()
+
+        # Корректный JSON, но id не влезает в INTEGER: 400, а не 500
+        for raw in (
+            b'["2020-01-01T00:00:00", 1e400]',
+            b'["2020-01-01T00:00:00", 99999999999999999999999]',
+            b'["2020-01-01T00:00:00", 0]',
+        ):
+            cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+            response = client.get("/suggestions", params={"cursor": cursor})
+            assert response.status_code == 400, raw
+            assert response.json()["detail"] == "Invalid cursor"
+
+    def test_get_suggestions_failure_returns_500(self, client, monkeypatch):
+        """Сбой при выборке с фильтром status дает 500, а не ошибку обработчика"""
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr("app.main.rows_to_json", broken)
+        response = client.get("/suggestions", params={"status": "pending"})
+
+        assert response.status_code == 500
+        assert "fetching suggestions" in response.json()["detail"]
+
+    def test_get_suggestions_unknown_field(self, client):
+        """Неизвестное поле в fields отклоняется с 400"""
+        response = client.get("/suggestions", params={"fields": "id,hashed_password"})
+
+        assert response.status_code == 400
+        assert "hashed_password" in response.json()["detail"]
+
+    def test_search_rejects_query_without_words(self, client):
+        """Запрос из одних операторов FTS не выполняется"""
+        response = client.get("/suggestions/search", params={"q": '" * ( -'})
+
+        assert response.status_code == 400
+
     def test_create_suggestion_unauthorized(self, client):
         """Попытка создания предложения без авторизации"""
         suggestion_data = {
@@ -114,3 +542,11 @@ class TestSuggestions:
         )
 
         assert response.status_code == 403
+
+    def test_export_requires_moderator(self, client, test_user):
+        """Обычный пользователь не может выгрузить все предложения"""
+        headers = {"Authorization": f"Bearer {test_user}"}
+
+        response = client.get("/suggestions/export", headers=headers)
+
+        assert response.status_code == 403